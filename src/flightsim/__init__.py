@@ -0,0 +1,17 @@
+"""
+
+Commercial aircraft flight simulator
+
+By Florian Topeza and Arthur Jolivet, ISAE-SUPAERO, 2024
+
+Submodules are not imported here: `import flightsim.physics` only loads the
+physics (and math), and the cockpit, Tk and pygame are only loaded when the
+interface is launched.
+
+"""
+
+
+def launch(scenario=None):
+    """Run the cockpit, see flightsim.cockpit.launch."""
+    from .cockpit import launch
+    return launch(scenario)
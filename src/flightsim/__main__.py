@@ -0,0 +1,30 @@
+"""
+
+python -m flightsim [--ap603] [--exit-after-first-frame]
+
+"""
+
+
+import argparse
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="flightsim", description="Commercial aircraft flight simulator")
+    parser.add_argument("--ap603", action="store_true", help="simulation inspired by the crash of the flight AP603")
+    parser.add_argument("--exit-after-first-frame", action="store_true",
+                        help="print the wall clock time of the first frame and quit, used by flightsim.startup")
+    args = parser.parse_args()
+
+    on_first_frame = None
+    if args.exit_after_first_frame:
+        def on_first_frame(cockpit):
+            print(f"first frame {time.time()}", flush=True)
+            cockpit.root.after(0, cockpit.root.destroy)
+
+    from .cockpit import launch
+    launch("ap603" if args.ap603 else None, on_first_frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+
+Aircraft type profiles
+
+A profile is a JSON file of the aircraft folder giving a readable name and
+the plane constants of flightsim.physics (MASS, NB_ENGINES, ENGINE_THRUST,
+WING_SURFACE, STALL_ANGLE_DEG, CL_MAX, CD0, CD_K, STATIC_MARGIN). Missing
+constants take the value of flightsim.physics. The type of the plane is the
+file name without extension.
+
+"""
+
+
+import json
+import os
+
+from .physics import make_params
+
+
+AIRCRAFT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aircraft")
+
+
+def load_profile(path):
+    """Parameters of step() for one profile file, derived constants included."""
+    with open(path) as f:
+        data = json.load(f)
+    name = data.pop("name", None)
+    params = make_params(**data)
+    params["TYPE"] = os.path.splitext(os.path.basename(path))[0]
+    params["NAME"] = name or params["TYPE"]
+    return params
+
+
+def load_profiles(directory=AIRCRAFT_DIR):
+    """Every profile of a folder, by type."""
+    profiles = {}
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            params = load_profile(os.path.join(directory, file_name))
+            profiles[params["TYPE"]] = params
+    return profiles
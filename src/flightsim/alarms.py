@@ -0,0 +1,331 @@
+"""
+
+Alarm rules
+
+An alarm is described by a rule, a plain dictionary:
+
+    {
+        "name": "stall",
+        "when": [[("pitch_deg", "abs>", 15)],
+                 [("speed", "<", 50, 5), ("altitude_feet", ">", 300)]],
+        "priority": 1,               # highest active priority sets the status text
+        "message": "STALL, PUSH DOWN",
+        "sound": "stall",            # attribute of flightsim.audio.Sounds
+        "rearm": 9,                  # simulated s between two repetitions while active
+        "latch": False,              # stays active once raised, until reset()
+    }
+
+"when" holds if any of its groups holds, and a group if all its conditions
+hold. A condition is (channel, operator, threshold) or (channel, operator,
+threshold, hysteresis), with the operators ">", "<" and "abs>", and a
+threshold which is a number or the name of another channel (a plane
+parameter such as STALL_ANGLE for instance). Once the alarm is active, its
+thresholds are moved by the hysteresis so that it does not chatter around
+them.
+
+Rules are compiled once into functions working on whole columns, one value
+per plane, so a fleet of any size is checked in one pass per condition. An
+AlarmEngine evaluates them on samples of flightsim.analytics (a number per
+channel for one plane, a list for a fleet) and can be chained like the
+operators of flightsim.analytics:
+
+    engine = AlarmEngine(FLEET_RULES)
+    run(fleet_telemetry(fleet, 0.1, 600, engine.channels), engine)
+    print(engine.summary())
+
+"""
+
+
+import math
+import operator
+from collections import deque
+
+from . import metrics
+from .physics import STALL_ANGLE_DEG
+
+
+NOMINAL_STATUS = ("Flight is nominal", "white")
+RULE_DEFAULTS = {"priority": 0, "message": None, "color": "red", "sound": None, "rearm": math.inf, "latch": False}
+
+# Channels computed from others when a sample does not provide them, over
+# flat ground for the heights
+DERIVED_CHANNELS = {
+    "pitch_deg": ("pitch", math.degrees),
+    "roll_deg": ("roll", math.degrees),
+    "height_feet": ("altitude_feet", None),
+    "clearance_ahead": ("altitude", None),
+}
+
+_TESTS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    "abs>": lambda value, threshold: abs(value) > threshold,
+}
+
+
+## Rules of the cockpit
+
+# Re-arm intervals are in simulated time, the cockpit flies DT / TICK_PERIOD
+# simulated s per wall clock s: the sounds ring again every 1.8 s and 2 s
+COCKPIT_TIME_RATE = 5 # simulated s per s
+
+STALL_RULE = {
+    "name": "stall",
+    "when": [
+        [("pitch_deg", "abs>", STALL_ANGLE_DEG)],
+        [("roll_deg", "abs>", 45)],
+        [("speed", "<", 50, 5), ("altitude_feet", ">", 300)],
+    ],
+    "priority": 1,
+    "message": "STALL, PUSH DOWN",
+    "sound": "stall",
+    "rearm": 1.8 * COCKPIT_TIME_RATE, # simulated s
+}
+
+TOO_LOW_RULE = {
+    "name": "too_low",
+    "when": [
+        [("height_feet", "<", 300, 30), ("vz", "<", -10, 2)],
+        [("clearance_ahead", "<", 0)], # the flight path meets the terrain within LOOK_AHEAD_TIME
+    ],
+    "priority": 2,
+    "message": "TOO LOW TERRAIN, PULL UP",
+    "sound": "too_low",
+    "rearm": 2 * COCKPIT_TIME_RATE, # simulated s
+}
+
+COCKPIT_RULES = (STALL_RULE, TOO_LOW_RULE)
+
+# Fleets fly aircraft types with different stall angles, stall is compared
+# to the angle of attack and the stall angle of each type instead
+FLEET_STALL_RULE = dict(STALL_RULE, when=[[("aoa", "abs>", "STALL_ANGLE")], [("roll_deg", "abs>", 45)]])
+FLEET_RULES = (FLEET_STALL_RULE, TOO_LOW_RULE)
+
+
+## Compilation
+
+def _compile_condition(condition):
+    channel, op, threshold = condition[:3]
+    hysteresis = condition[3] if len(condition) > 3 else 0
+    test = _TESTS[op]
+    # Threshold once active, relaxed towards the safe side
+    relax = -hysteresis if op in (">", "abs>") else hysteresis
+
+    if isinstance(threshold, str):
+        def evaluate(column, active):
+            return [test(v, th + relax if a else th) for v, th, a in zip(column(channel), column(threshold), active)]
+    else:
+        released = threshold + relax
+        def evaluate(column, active):
+            return [test(v, released if a else threshold) for v, a in zip(column(channel), active)]
+    return evaluate
+
+
+def _compile_group(group):
+    conditions = [_compile_condition(condition) for condition in group]
+    if len(conditions) == 1:
+        return conditions[0]
+    def evaluate(column, active):
+        flags = conditions[0](column, active)
+        for condition in conditions[1:]:
+            flags = [f and g for f, g in zip(flags, condition(column, active))]
+        return flags
+    return evaluate
+
+
+def compile_rule(rule):
+    """Complete a rule with the defaults and compile its condition.
+
+    Returns the completed rule, the function (column, active) -> flags
+    where column(name) gives the values of a channel for every plane and
+    active the current state of the alarm of every plane, and the channels
+    it reads.
+    """
+    unknown = set(rule) - set(RULE_DEFAULTS) - {"name", "when"}
+    if unknown:
+        raise KeyError(f"unknown alarm rule keys: {', '.join(sorted(unknown))}")
+    rule = {**RULE_DEFAULTS, **rule}
+    groups = [_compile_group(group) for group in rule["when"]]
+    channels = []
+    for group in rule["when"]:
+        for condition in group:
+            if condition[1] not in _TESTS:
+                raise ValueError(f"unknown operator {condition[1]} in alarm rule {rule['name']}")
+            for name in (condition[0], condition[2]):
+                if isinstance(name, str) and name not in channels:
+                    channels.append(name)
+
+    if len(groups) == 1:
+        return rule, groups[0], channels
+    def evaluate(column, active):
+        flags = groups[0](column, active)
+        for group in groups[1:]:
+            flags = [f or g for f, g in zip(flags, group(column, active))]
+        return flags
+    return rule, evaluate, channels
+
+
+def column_reader(sample):
+    """column(name) giving the values of a channel of a sample for every plane, derived channels included."""
+    def column(name):
+        if name not in sample and name in DERIVED_CHANNELS:
+            base, convert = DERIVED_CHANNELS[name]
+            values = column(base)
+            return values if convert is None else [convert(v) for v in values]
+        value = sample[name]
+        return value if isinstance(value, list) else [value]
+    return column
+
+
+def raise_condition(rule):
+    """Function telling whether a rule raises its alarm on a sample of one plane, without hysteresis."""
+    _, evaluate, _ = compile_rule(rule)
+    inactive = [False]
+    def holds(sample):
+        return evaluate(column_reader(sample), inactive)[0]
+    return holds
+
+
+## Engine
+
+_activation_counters = {"stall": metrics.STALL_ALARMS, "too_low": metrics.TOO_LOW_ALARMS}
+
+def _activations(name):
+    if name not in _activation_counters:
+        _activation_counters[name] = metrics.counter("flightsim_alarm_activations_total", "Alarm activations.", {"alarm": name + "_alarm"})
+    return _activation_counters[name]
+
+
+class _Alarm:
+
+    def __init__(self, rule):
+        self.rule, self.evaluate, self.channels = compile_rule(rule)
+        self.name = self.rule["name"]
+        self.active = [] # per plane
+        self.fired = [] # simulated time of the last raise or repetition, per plane
+        self.activations = 0
+        self.active_time = 0.0 # summed over every plane
+        self.longest = 0.0
+        self.planes = set() # planes which raised the alarm
+        self._since = [] # simulated time the alarm was raised, per plane
+
+    def resize(self, size):
+        grow = size - len(self.active)
+        if grow > 0:
+            self.active += [False] * grow
+            self.fired += [-math.inf] * grow
+            self._since += [None] * grow
+
+
+class AlarmEngine:
+    """Evaluate alarm rules on every plane of a sample, keep the transitions and statistics.
+
+    `on_event(t, plane, name, kind)` is called for every transition if given,
+    kind being "raise" or "clear"; the last `keep` transitions are kept.
+    """
+
+    def __init__(self, rules=COCKPIT_RULES, keep=1000, on_event=None):
+        # By decreasing priority, the first active alarm gives the status
+        self.alarms = sorted((_Alarm(rule) for rule in rules), key=lambda alarm: -alarm.rule["priority"])
+        self.rules = {alarm.name: alarm.rule for alarm in self.alarms}
+        self.channels = []
+        for alarm in self.alarms:
+            for name in alarm.channels:
+                base = DERIVED_CHANNELS[name][0] if name in DERIVED_CHANNELS else name
+                if base not in self.channels:
+                    self.channels.append(base)
+        self.on_event = on_event
+        self.events = deque(maxlen=keep) # (t, plane, name, kind)
+        self._last_t = None
+
+    def evaluate(self, sample):
+        """Check every rule on a sample, return the events [(t, plane, name, kind)] of this evaluation.
+
+        Besides the transitions "raise" and "clear", kind is "repeat" when an
+        alarm is still active `rearm` seconds after it was raised or repeated,
+        for the cockpit to ring again. Repetitions are not kept in the log.
+        """
+        t = sample["t"]
+        if self._last_t is not None and t < self._last_t:
+            self._end_flight(self._last_t)
+        dt = t - self._last_t if self._last_t is not None else 0
+        self._last_t = t
+        column = column_reader(sample)
+        events = []
+        for alarm in self.alarms:
+            alarm.resize(len(column(alarm.channels[0])))
+            active = alarm.active
+            flags = alarm.evaluate(column, active)
+            alarm.active_time += dt * sum(active)
+            rule = alarm.rule
+            for plane, flag in enumerate(flags):
+                if active[plane]:
+                    if flag or rule["latch"]:
+                        if t - alarm.fired[plane] >= rule["rearm"]:
+                            alarm.fired[plane] = t
+                            events.append((t, plane, alarm.name, "repeat"))
+                    else:
+                        self._clear(alarm, plane, t)
+                        events.append((t, plane, alarm.name, "clear"))
+                elif flag:
+                    active[plane] = True
+                    alarm.fired[plane] = t
+                    alarm._since[plane] = t
+                    alarm.activations += 1
+                    alarm.planes.add(plane)
+                    _activations(alarm.name).inc()
+                    self._log(t, plane, alarm.name, "raise")
+                    events.append((t, plane, alarm.name, "raise"))
+        return events
+
+    def _log(self, t, plane, name, kind):
+        self.events.append((t, plane, name, kind))
+        if self.on_event is not None:
+            self.on_event(t, plane, name, kind)
+
+    def _clear(self, alarm, plane, t):
+        alarm.active[plane] = False
+        alarm.longest = max(alarm.longest, t - alarm._since[plane])
+        alarm._since[plane] = None
+        self._log(t, plane, alarm.name, "clear")
+
+    def _end_flight(self, t):
+        for alarm in self.alarms:
+            for plane, active in enumerate(alarm.active):
+                if active:
+                    self._clear(alarm, plane, t)
+            alarm.fired = [-math.inf] * len(alarm.fired)
+
+    def reset(self, name=None, plane=None, t=None):
+        """Clear a latched alarm (every alarm if name is None) of a plane (every plane if plane is None)."""
+        t = self._last_t if t is None else t
+        for alarm in self.alarms:
+            if name is not None and alarm.name != name:
+                continue
+            for p, active in enumerate(alarm.active):
+                if active and (plane is None or p == plane):
+                    self._clear(alarm, p, t)
+
+    def active(self, name, plane=0):
+        alarm = next(alarm for alarm in self.alarms if alarm.name == name)
+        return plane < len(alarm.active) and alarm.active[plane]
+
+    def status(self, plane=0):
+        """Message and color of the active alarm of highest priority, NOMINAL_STATUS if none."""
+        for alarm in self.alarms:
+            if plane < len(alarm.active) and alarm.active[plane] and alarm.rule["message"] is not None:
+                return alarm.rule["message"], alarm.rule["color"]
+        return NOMINAL_STATUS
+
+    # Used as an operator of flightsim.analytics
+    def __call__(self, samples):
+        for sample in samples:
+            self.evaluate(sample)
+            yield sample
+        if self._last_t is not None:
+            self._end_flight(self._last_t)
+            self._last_t = None
+
+    def summary(self):
+        return [{"alarm": alarm.name, "activations": alarm.activations, "planes": len(alarm.planes),
+                 "active_time": alarm.active_time, "longest": alarm.longest} for alarm in self.alarms]
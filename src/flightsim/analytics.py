@@ -0,0 +1,271 @@
+"""
+
+Streaming analytics over the telemetry stream
+
+Instead of recording every step and analyzing the trajectory afterwards,
+operators are chained on the step loop and keep only running aggregates,
+so their memory use does not depend on the length of the flight or on the
+number of flights.
+
+A source yields one sample per step: a mapping from channel names (state
+variables of flightsim.physics.make_state, plus plane parameters such as
+STALL_ANGLE) to values. Samples of a single plane hold numbers, samples of
+a fleet hold one list per channel, one value per plane; "t" is always a
+number. Every operator is a generator passing the samples through
+unchanged, so operators compose like a pipeline:
+
+    stats = RunningStats("altitude")
+    stall = Episodes("stall", ("aoa", "STALL_ANGLE"), lambda aoa, stall_angle: abs(aoa) > stall_angle)
+    run(telemetry(state, 0.1, 600), stats, stall)
+    print(stats.summary(), stall.summary())
+
+A new flight starts whenever t goes backwards, so the telemetry of several
+flights can be chained one after the other into the same operators.
+
+"""
+
+
+import math
+from collections import ChainMap, deque
+
+from .alarms import FLEET_STALL_RULE, TOO_LOW_RULE, column_reader, compile_rule
+from .physics import DEFAULT_PARAMS, step
+
+
+## Sources
+
+def telemetry(state, dt, duration, weather=None, params=DEFAULT_PARAMS):
+    """Fly one plane and yield a sample after every step (a live view, not a copy)."""
+    sample = ChainMap(state, params)
+    yield sample
+    for _ in range(int(duration / dt)):
+        step(state, dt, weather, params)
+        yield sample
+
+
+def fleet_telemetry(fleet, dt, duration, channels):
+    """Fly a fleet and yield a sample of the given channels after every step."""
+    def sample():
+        columns = {name: fleet.column(name) for name in channels}
+        columns["t"] = fleet.states[0]["t"] if len(fleet) else 0
+        return columns
+    yield sample()
+    for _ in range(int(duration / dt)):
+        fleet.step(dt)
+        yield sample()
+
+
+def _column(sample, name):
+    value = sample[name]
+    return value if isinstance(value, list) else [value]
+
+
+## Pipeline
+
+def pipeline(source, *operators):
+    """Chain operators on a source, returns the resulting iterator of samples."""
+    for operator in operators:
+        source = operator(source)
+    return source
+
+
+def run(source, *operators):
+    """Drain the pipeline and return the operators, holding their results."""
+    for _ in pipeline(source, *operators):
+        pass
+    return operators
+
+
+## Operators
+
+class RunningStats:
+    """Count, min, max, mean and variance of a channel over every plane and step (Welford)."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def __call__(self, samples):
+        for sample in samples:
+            for x in _column(sample, self.channel):
+                self.count += 1
+                delta = x - self.mean
+                self.mean += delta / self.count
+                self._m2 += delta * (x - self.mean)
+                if x < self.min:
+                    self.min = x
+                if x > self.max:
+                    self.max = x
+            yield sample
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def summary(self):
+        return {"channel": self.channel, "count": self.count, "min": self.min, "max": self.max,
+                "mean": self.mean, "std": math.sqrt(self.variance)}
+
+
+class _PlaneCondition:
+    """Base of the operators following a per-plane condition on some channels over time."""
+
+    def __init__(self, channels, predicate):
+        self.channels = channels
+        self.predicate = predicate
+        self._last_t = None
+
+    def __call__(self, samples):
+        for sample in samples:
+            t = sample["t"]
+            if self._last_t is not None and t < self._last_t:
+                self._end_flight(self._last_t)
+            dt = t - self._last_t if self._last_t is not None and t >= self._last_t else 0
+            flags = self._flags(sample)
+            self._update(t, dt, flags, sample)
+            self._last_t = t
+            yield sample
+        if self._last_t is not None:
+            self._end_flight(self._last_t)
+            self._last_t = None
+
+    def _flags(self, sample):
+        return [self.predicate(*values) for values in zip(*(_column(sample, c) for c in self.channels))]
+
+    def _end_flight(self, t):
+        pass
+
+
+class Episodes(_PlaneCondition):
+    """Periods during which a condition holds (e.g. stall), with their start and end times.
+
+    Only counts, durations and the last `keep` episodes are kept in memory;
+    `on_episode(plane, start, end)` is called for every episode if given.
+    """
+
+    def __init__(self, name, channels, predicate, keep=100, on_episode=None):
+        super().__init__(channels, predicate)
+        self.name = name
+        self.on_episode = on_episode
+        self.count = 0
+        self.total_time = 0.0
+        self.longest = 0.0
+        self.recent = deque(maxlen=keep) # (plane, start, end)
+        self._open = {} # plane -> start time
+
+    def _update(self, t, dt, flags, sample):
+        for plane, flag in enumerate(flags):
+            if flag and plane not in self._open:
+                self._open[plane] = t
+            elif not flag and plane in self._open:
+                self._close(plane, t)
+
+    def _close(self, plane, end):
+        start = self._open.pop(plane)
+        duration = end - start
+        self.count += 1
+        self.total_time += duration
+        self.longest = max(self.longest, duration)
+        self.recent.append((plane, start, end))
+        if self.on_episode is not None:
+            self.on_episode(plane, start, end)
+
+    def _end_flight(self, t):
+        for plane in list(self._open):
+            self._close(plane, t)
+
+    def summary(self):
+        return {"episode": self.name, "count": self.count, "total_time": self.total_time, "longest": self.longest}
+
+
+class RuleEpisodes(Episodes):
+    """Episodes during which an alarm rule of flightsim.alarms is active, hysteresis included."""
+
+    def __init__(self, rule, keep=100, on_episode=None):
+        rule, self.evaluate, channels = compile_rule(rule)
+        super().__init__(rule["name"], channels, None, keep, on_episode)
+
+    def _flags(self, sample):
+        column = column_reader(sample)
+        active = [plane in self._open for plane in range(len(column(self.channels[0])))]
+        return self.evaluate(column, active)
+
+
+class TimeInEnvelope(_PlaneCondition):
+    """Fraction of the flight time, over every plane, spent inside an envelope."""
+
+    def __init__(self, name, channels, predicate):
+        super().__init__(channels, predicate)
+        self.name = name
+        self.inside = 0.0
+        self.total = 0.0
+        self._previous = None
+
+    def _update(self, t, dt, flags, sample):
+        # The state at the start of each step decides for the whole step
+        if self._previous is not None and dt > 0:
+            self.inside += dt * sum(self._previous)
+            self.total += dt * len(self._previous)
+        self._previous = flags
+
+    def _end_flight(self, t):
+        self._previous = None
+
+    @property
+    def fraction(self):
+        return self.inside / self.total if self.total else 0.0
+
+    def summary(self):
+        return {"envelope": self.name, "fraction": self.fraction, "time_inside": self.inside, "total_time": self.total}
+
+
+class ThresholdAlert(_PlaneCondition):
+    """Alert when a channel goes below `low` or above `high`, once per crossing.
+
+    `on_alert(t, plane, channel, value)` is called for every alert if given,
+    the last `keep` alerts are kept.
+    """
+
+    def __init__(self, channel, low=None, high=None, keep=100, on_alert=None):
+        low = -math.inf if low is None else low
+        high = math.inf if high is None else high
+        super().__init__((channel,), lambda x: not low <= x <= high)
+        self.channel = channel
+        self.on_alert = on_alert
+        self.count = 0
+        self.recent = deque(maxlen=keep) # (t, plane, value)
+        self._active = set()
+
+    def _update(self, t, dt, flags, sample):
+        values = _column(sample, self.channel)
+        for plane, flag in enumerate(flags):
+            if flag and plane not in self._active:
+                self._active.add(plane)
+                self.count += 1
+                self.recent.append((t, plane, values[plane]))
+                if self.on_alert is not None:
+                    self.on_alert(t, plane, self.channel, values[plane])
+            elif not flag:
+                self._active.discard(plane)
+
+    def _end_flight(self, t):
+        self._active.clear()
+
+    def summary(self):
+        return {"alert": self.channel, "count": self.count}
+
+
+## Usual operators
+
+def stall_episodes(**kwargs):
+    # Stall rule of the fleets, against the stall angle of each aircraft type
+    return RuleEpisodes(FLEET_STALL_RULE, **kwargs)
+
+
+def too_low_episodes(**kwargs):
+    # Too low rule of the cockpit, over flat ground
+    return RuleEpisodes(TOO_LOW_RULE, **kwargs)
@@ -0,0 +1,78 @@
+"""
+
+Flight simulation inspired by the crash of the flight AP603.
+Pilots of the flight AP603 were not able to control the plane because a technician forgot to remove covers on pressure sensors and crash the plane.
+In this simulation, alarms start to ring 60 seconds after the start of the simulation and the on board computer will start to give wrong altitude and speed values after 120 seconds.
+
+Authors:
+- Florian Topeza
+- Arthur Jolivet
+
+ISAE-SUPAERO, 2024
+
+"""
+
+
+import random as rd
+import time
+import tkinter as tk
+
+from .alarms import STALL_RULE, TOO_LOW_RULE
+from .cockpit import Cockpit
+from .physics import STALL_ANGLE_DEG
+
+
+STALL_TIME = 60 # s after the start, stall alarm rings
+TOO_LOW_TIME = 120 # s after the start, too low alarm rings and indicators go wrong
+TOO_LOW_WARNING_TIME = 290 # s after the start
+END_TIME = 300 # s after the start
+
+# The covered sensors make the alarms ring at fixed times, whatever the plane
+# does, on the wall clock like the rest of the scenario
+AP603_RULES = (
+    dict(STALL_RULE, message="STALL", when=[
+        [("pitch_deg", "abs>", STALL_ANGLE_DEG)],
+        [("roll_deg", "abs>", 45)],
+        [("speed", "<", 50, 5)],
+        [("elapsed", ">", STALL_TIME)],
+    ]),
+    dict(TOO_LOW_RULE, when=[[("elapsed", ">", TOO_LOW_TIME)]], message="STALL & PUSH DOWN"),
+)
+
+
+class AP603Cockpit(Cockpit):
+
+    title = "Cockpit Simulation - AP603"
+    rules = AP603_RULES
+
+    def __init__(self, on_first_frame=None):
+        # Wrong indicators once the too low alarm rings
+        self.too_low = False
+        super().__init__(on_first_frame)
+        self.too_low_frame = None
+
+    def too_low_warning(self):
+        if time.time() - self.start_time > TOO_LOW_WARNING_TIME and self.too_low_frame is None:
+            self.too_low_frame = tk.Frame(self.root)
+            too_low_label = tk.Label(self.too_low_frame, text="TOO LOW TERRAIN, PULL UP !", font=("Arial", 16), fg="red")
+            self.too_low_frame.pack(pady=20)
+            too_low_label.pack()
+
+    # The on board computer gives erratic information
+    def displayed_altitude_and_speed(self):
+        altitude_feet, speed = super().displayed_altitude_and_speed()
+        if self.too_low:
+            altitude_feet += rd.randint(10, 40)
+            speed += rd.randint(10, 20)
+        return altitude_feet, speed
+
+    # Function to update the simulation
+    def update(self):
+        super().update()
+        if self.start:
+            self.too_low_warning()
+            elapsed_time = time.time() - self.start_time
+            if elapsed_time > TOO_LOW_TIME:
+                self.too_low = True
+            if elapsed_time > END_TIME:
+                self.quit()
@@ -0,0 +1,24 @@
+"""
+
+Cockpit sounds
+
+pygame is only imported when the sounds are loaded, so that nothing but the
+cockpit pays for it.
+
+"""
+
+
+import os
+
+
+SOUNDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+
+
+class Sounds:
+
+    def __init__(self):
+        import pygame
+        pygame.mixer.init()
+        self.too_low = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, "too_low_alarm.wav"))
+        self.stall = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, "stall_alarm.wav"))
+        self.airplane = pygame.mixer.Sound(os.path.join(SOUNDS_DIR, "airplane.mp3"))
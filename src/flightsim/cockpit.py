@@ -0,0 +1,300 @@
+"""
+
+Cockpit of the flight simulation
+
+Tk interface flying one plane with flightsim.physics. Nothing happens at
+import: the window is built by Cockpit() and the sounds are only loaded
+once the first frame is on screen.
+
+Authors:
+- Florian Topeza
+- Arthur Jolivet
+
+ISAE-SUPAERO, 2024
+
+"""
+
+
+import math
+import os
+import time
+import tkinter as tk
+
+from . import metrics
+from .alarms import AlarmEngine, COCKPIT_RULES, NOMINAL_STATUS
+from .pacing import TickMonitor, SKIP_LABELS, REDUCE_ALARMS, COALESCE_PHYSICS
+from .pfd import PrimaryFlightDisplay
+from .physics import ground_velocity, make_state, step
+from .predictor import TrajectoryPredictor
+from .terrain import TerrainDatabase
+from .weather import WeatherField
+
+
+# Initial state of the plane
+INITIAL_PITCH_DEG = 5 # deg
+INITIAL_ROLL_DEG = 0 # deg
+INITIAL_THROTTLE = 0.5 # between 0 and 1
+INITIAL_ALTITUDE = 1000 # m
+INITIAL_VZ = 0 # m.s^(-1)
+INITIAL_VX = 100 # m.s^(-1)
+
+# Simulation
+DT = 0.5 # simulated s per tick, DT / TICK_PERIOD is flightsim.alarms.COCKPIT_TIME_RATE
+
+# Pacing of the simulation loop
+TICK_PERIOD = 0.1 # s
+PHYSICS_SUBSTEPS = 5 # physics steps per tick
+MAX_CATCH_UP = 10 # ticks of simulated time caught up after a late tick at most
+LABEL_DIVIDER = 3 # ticks between two label refreshes when shedding load
+ALARM_DIVIDER = 5 # ticks between two alarm evaluations when shedding load
+
+# Primary flight display, drawn independently of the simulation ticks
+FRAME_PERIOD = 0.025 # s, 40 frames per second
+
+# Terrain database and weather field, looked for in the working directory
+TERRAIN_DIR = 'terrain'
+LOOK_AHEAD_TIME = 30 # s
+WEATHER_FILE = 'weather.json'
+
+# Trajectory prediction
+PREDICTION_TIMES = (30, 60, 120) # s ahead
+
+
+class Cockpit:
+
+    title = "Cockpit Simulation"
+    rules = COCKPIT_RULES # see flightsim.alarms
+
+    def __init__(self, on_first_frame=None):
+        self.on_first_frame = on_first_frame
+
+        # Plane
+        self.pitch_deg = INITIAL_PITCH_DEG
+        self.roll_deg = INITIAL_ROLL_DEG
+        self.throttle = INITIAL_THROTTLE
+        self.state = make_state(INITIAL_PITCH_DEG * math.pi/180, INITIAL_ROLL_DEG * math.pi/180, INITIAL_THROTTLE,
+                                INITIAL_ALTITUDE, INITIAL_VZ, INITIAL_VX)
+
+        # Plane alarms
+        self.alarms = AlarmEngine(self.rules)
+        self.status = NOMINAL_STATUS
+
+        # Simulation
+        self.start = False
+        self.start_time = 0
+        self.monitor = TickMonitor(TICK_PERIOD)
+        self.sounds = None
+
+        # Environment, flat ground, still air and standard atmosphere if none is provided
+        self.terrain = TerrainDatabase(TERRAIN_DIR) if os.path.isdir(TERRAIN_DIR) else None
+        self.weather_field = WeatherField(WEATHER_FILE) if os.path.isfile(WEATHER_FILE) else None
+        self.weather = self.weather_field.probe() if self.weather_field is not None else None
+
+        # Trajectory predictor running in the background
+        self.predictor = TrajectoryPredictor(DT, max(PREDICTION_TIMES), TERRAIN_DIR if self.terrain is not None else None, self.weather_field)
+
+        self.build_interface()
+
+    ## Graphical interface
+
+    def build_interface(self):
+        self.root = root = tk.Tk()
+        root.title(self.title)
+        root.geometry("800x600")
+
+        self.status_label = tk.Label(root, text="Flight is nominal", font=("Helvetica", 16), bg="black", fg="white")
+        self.status_label.pack(pady=20)
+
+        # Frame for the indicators
+        indicators_frame = tk.Frame(root, bg="black", bd=2, relief=tk.SUNKEN)
+        indicators_frame.pack(pady=20, padx=20, fill=tk.X)
+
+        # Frame for the prediction
+        self.altitude_frame = altitude_frame = tk.Frame(root, bg="black", bd=2, relief=tk.SUNKEN)
+        altitude_frame.pack(pady=20, padx=20, fill=tk.Y, side=tk.LEFT)
+
+        # Frame for the controls
+        controls_frame = tk.Frame(root)
+        controls_frame.pack(pady=20, padx=20, fill=tk.X, side=tk.RIGHT)
+
+        controls_label = tk.Label(controls_frame, text="Controls:\nP: Pitch up\np: Pitch down\nR: Roll up\nr: Roll down\nT: Throttle up\nt: Throttle down", font=("Arial", 10), bg="black", fg="white", justify=tk.LEFT)
+        controls_label.pack(pady=10)
+
+        # Primary flight display: horizon, speed, altitude and heading tapes, throttle
+        self.pfd = PrimaryFlightDisplay(indicators_frame)
+        self.pfd.canvas.pack(pady=10)
+        self.displayed = self.displayed_altitude_and_speed()
+
+        # Label for the predicted trajectory
+        self.prediction_label = tk.Label(altitude_frame, text="", font=("Helvetica", 12), bg="black", fg="white", justify=tk.LEFT)
+        self.prediction_label.pack(pady=10)
+
+        # Binding the key press event
+        root.bind("<KeyPress>", self.on_key_press)
+
+    def first_frame(self):
+        if self.on_first_frame is not None:
+            self.on_first_frame(self)
+        # The sounds are not needed to draw the window, load them once it is shown
+        from .audio import Sounds
+        self.sounds = Sounds()
+
+    ## Sounds
+
+    def airplane_sound(self):
+        self.sounds.airplane.play()
+        self.root.after(60000, self.airplane_sound)
+
+    ## Alarms
+
+    # Channels of the alarm rules, besides the state of the plane
+    def alarm_sample(self):
+        s = self.state
+        sample = dict(s)
+        sample["elapsed"] = time.time() - self.start_time # wall clock s since the start
+        sample["pitch_deg"] = self.pitch_deg
+        sample["roll_deg"] = self.roll_deg
+        sample["height_feet"] = s["altitude_feet"]
+        sample["clearance_ahead"] = s["altitude"]
+        if self.terrain is not None:
+            sample["height_feet"] -= int(3*self.terrain.height_at(s["north"], s["east"]))
+            wind_north = wind_east = 0
+            if self.weather is not None:
+                wind_north, wind_east, _, _ = self.weather.sample(s["t"], s["north"], s["east"], s["altitude"])
+            v_north, v_east = ground_velocity(s["vx"], s["heading"], wind_north, wind_east)
+            sample["clearance_ahead"] = self.terrain.min_clearance_ahead(s["north"], s["east"], v_north, v_east, s["vz"], s["altitude"], LOOK_AHEAD_TIME)
+        return sample
+
+    # Function to manage the alarms: ring, stop and show the most important one
+    def check_alarms(self):
+        for t, plane, name, kind in self.alarms.evaluate(self.alarm_sample()):
+            sound = self.alarms.rules[name]["sound"]
+            if sound is None:
+                continue
+            if kind == "clear":
+                getattr(self.sounds, sound).stop()
+            else:
+                getattr(self.sounds, sound).play()
+        status = self.alarms.status()
+        if status != self.status:
+            self.status = status
+            self.status_label.config(text=status[0], fg=status[1])
+
+    ## Simulation
+
+    # Function to update the simulation
+    def update(self):
+        monitor = self.monitor
+        elapsed = monitor.begin()
+        if self.start:
+            # Simulated time follows the wall clock even when ticks are late
+            advance = DT * min(elapsed / TICK_PERIOD, MAX_CATCH_UP)
+            if monitor.level >= COALESCE_PHYSICS:
+                # One step per DT at most: longer steps make step() diverge (see flightsim.stability)
+                substeps = max(1, math.ceil(advance / DT))
+            else:
+                substeps = max(1, round(advance / DT * PHYSICS_SUBSTEPS))
+            for _ in range(substeps):
+                step(self.state, advance / substeps, self.weather)
+            metrics.PHYSICS_STEPS.inc(substeps)
+            metrics.SIMULATED_SECONDS.inc(advance)
+            metrics.REAL_TIME_FACTOR.set(advance / elapsed)
+            self.predictor.update(self.state)
+            if monitor.level < REDUCE_ALARMS or monitor.ticks % ALARM_DIVIDER == 0:
+                self.check_alarms()
+            if monitor.level < SKIP_LABELS or monitor.ticks % LABEL_DIVIDER == 0:
+                self.displayed = self.displayed_altitude_and_speed()
+                self.update_prediction_label()
+        delay = monitor.end()
+        metrics.TICK_SECONDS.observe(monitor.last_cost)
+        metrics.TICK_LATENESS_SECONDS.observe(monitor.last_lateness)
+        self.root.after(delay, self.update)
+
+    # Function to manage the key press
+    def on_key_press(self, event):
+        if event.keysym == 'P':
+            self.pitch_deg += 1
+        elif event.keysym == 'p':
+            self.pitch_deg -= 1
+        elif event.keysym == 'R':
+            self.roll_deg += 1
+        elif event.keysym == 'r':
+            self.roll_deg -= 1
+        elif event.keysym == 'T':
+            if self.throttle < 1:
+                self.throttle = round(self.throttle + 0.01,2)
+        elif event.keysym == 't':
+            if self.throttle > 0.01:
+                self.throttle = round(self.throttle - 0.01,2)
+        elif event.keysym == 'S':
+            if self.sounds is None:
+                return
+            self.start = True
+            self.airplane_sound()
+            self.start_time = time.time()
+        elif event.keysym == 'Escape':
+            self.quit()
+            return
+        self.state["pitch"] = self.pitch_deg * math.pi / 180
+        self.state["roll"] = self.roll_deg * math.pi / 180
+        self.state["throttle"] = self.throttle
+        if self.start:
+            self.predictor.restart(self.state)
+
+    def quit(self):
+        self.predictor.stop()
+        print(self.monitor.report())
+        print(f"display frames: {self.pfd.frame_cost}")
+        self.root.quit()
+
+    ## Indicators
+
+    def displayed_altitude_and_speed(self):
+        return self.state["altitude_feet"], int(self.state["speed"])
+
+    # Draw a frame of the primary flight display. Controls are shown as soon as
+    # they change, altitude and speed as displayed at the last simulation tick
+    def render(self):
+        started = time.perf_counter()
+        altitude_feet, speed = self.displayed
+        self.pfd.draw(self.pitch_deg, self.roll_deg, self.throttle, altitude_feet, speed, math.degrees(self.state["heading"]))
+        period = FRAME_PERIOD * (LABEL_DIVIDER if self.monitor.level >= SKIP_LABELS else 1)
+        delay = period - (time.perf_counter() - started)
+        self.root.after(max(1, int(1000 * delay)), self.render)
+
+    # Function to update the predicted altitude and speed
+    def update_prediction_label(self):
+        prediction = self.predictor.prediction()
+        if prediction is None:
+            return
+        text = "\n".join(f"In {ahead} s: {int(3*p[1])} ft, {int(p[2])} m/s" for ahead in PREDICTION_TIMES for p in [prediction.at(ahead)])
+        time_to_too_low = prediction.time_to_too_low()
+        if time_to_too_low is not None:
+            self.prediction_label.config(text=f"{text}\nTERRAIN IN {int(time_to_too_low)} s", fg="orange")
+        else:
+            self.prediction_label.config(text=text, fg="white")
+
+    ## Run simulation
+
+    def run(self):
+        # Serve live metrics if FLIGHTSIM_METRICS_PORT is set
+        metrics.serve_from_env()
+        self.root.after_idle(self.first_frame)
+        # Start the update function and the display
+        self.update()
+        self.render()
+        # Start the graphical interface
+        self.root.mainloop()
+
+
+def launch(scenario=None, on_first_frame=None):
+    """Build the cockpit of a scenario (None or "ap603") and run it until the window is closed."""
+    if scenario == "ap603":
+        from .ap603 import AP603Cockpit
+        cockpit = AP603Cockpit(on_first_frame)
+    elif scenario is None:
+        cockpit = Cockpit(on_first_frame)
+    else:
+        raise ValueError(f"unknown scenario {scenario}")
+    cockpit.run()
+    return cockpit
@@ -0,0 +1,56 @@
+"""
+
+Batch simulation of a mixed fleet
+
+A Fleet steps many planes of possibly different types together. Every plane
+carries a reference to the parameters of its type, whose derived constants
+are computed once when the profile is loaded, so stepping a mixed fleet
+costs the same as stepping planes of a single type.
+
+"""
+
+
+from .physics import step
+from .aircraft import load_profiles
+from . import metrics
+
+
+class Fleet:
+
+    def __init__(self, profiles=None, weather_field=None):
+        self.profiles = profiles if profiles is not None else load_profiles()
+        self.weather_field = weather_field
+        self.types = [] # type of each plane
+        self.params = [] # parameters of each plane, shared between planes of a type
+        self.states = [] # state of each plane, see flightsim.physics.make_state
+        self.probes = [] # weather probe of each plane
+
+    def __len__(self):
+        return len(self.states)
+
+    def add(self, aircraft_type, state):
+        """Add a plane of a type of the profiles, return its index."""
+        self.types.append(aircraft_type)
+        self.params.append(self.profiles[aircraft_type])
+        self.states.append(dict(state))
+        self.probes.append(self.weather_field.probe() if self.weather_field is not None else None)
+        return len(self.states) - 1
+
+    def step(self, dt):
+        for state, params, probe in zip(self.states, self.params, self.probes):
+            step(state, dt, probe, params)
+        metrics.PHYSICS_STEPS.inc(len(self.states))
+        metrics.SIMULATED_SECONDS.inc(dt * len(self.states))
+
+    def column(self, name):
+        """Value of a state variable, or of a plane parameter such as STALL_ANGLE, for every plane."""
+        if self.states and name not in self.states[0]:
+            return [params[name] for params in self.params]
+        return [state[name] for state in self.states]
+
+    def by_type(self):
+        """Indices of the planes of each type."""
+        groups = {}
+        for i, aircraft_type in enumerate(self.types):
+            groups.setdefault(aircraft_type, []).append(i)
+        return groups
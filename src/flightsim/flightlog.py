@@ -0,0 +1,122 @@
+"""
+
+Binary flight logs
+
+A flight log starts with a text header line, "FLIGHTLOG 1" followed by a
+JSON list of channel names and padded with spaces to a multiple of 8 bytes,
+then holds one row of little-endian float64 per step: the time followed by
+every channel.
+
+Logs are written with a Recorder chained on the telemetry stream (see
+analytics.py) and read back lazily with FlightLog: the file is
+memory-mapped and each channel is a strided view on it, so nothing is
+loaded before it is used.
+
+"""
+
+
+import json
+import mmap
+import sys
+from array import array
+
+
+MAGIC = "FLIGHTLOG 1"
+DEFAULT_CHANNELS = ("altitude", "speed", "thrust", "vz", "vx", "aoa", "slope", "cl", "cd", "lift", "drag")
+FLUSH_ROWS = 4096
+
+
+def _check_byte_order():
+    if sys.byteorder != "little":
+        raise RuntimeError("flight logs are little-endian float64, big-endian hosts are not supported")
+
+
+class LogWriter:
+
+    def __init__(self, path, channels=DEFAULT_CHANNELS):
+        _check_byte_order()
+        self.channels = tuple(channels)
+        self.file = open(path, "wb")
+        header = f"{MAGIC} {json.dumps(self.channels)}"
+        header += " " * (-(len(header) + 1) % 8) + "\n"
+        self.file.write(header.encode())
+        self._buffer = array("d")
+
+    def write(self, t, values):
+        self._buffer.append(t)
+        self._buffer.extend(values)
+        if len(self._buffer) >= FLUSH_ROWS * (len(self.channels) + 1):
+            self.flush()
+
+    def flush(self):
+        self._buffer.tofile(self.file)
+        self._buffer = array("d")
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class Recorder:
+    """Operator writing the telemetry stream to a flight log, one plane of a fleet at most."""
+
+    def __init__(self, path, channels=DEFAULT_CHANNELS, plane=0):
+        self.path = path
+        self.channels = tuple(channels)
+        self.plane = plane
+
+    def __call__(self, samples):
+        writer = LogWriter(self.path, self.channels)
+        try:
+            for sample in samples:
+                values = [sample[c] for c in self.channels]
+                if values and isinstance(values[0], list):
+                    values = [v[self.plane] for v in values]
+                writer.write(sample["t"], values)
+                yield sample
+        finally:
+            writer.close()
+
+
+class FlightLog:
+    """Memory-mapped flight log, channels are read lazily."""
+
+    def __init__(self, path):
+        _check_byte_order()
+        self.path = path
+        self.file = open(path, "rb")
+        header = self.file.readline().decode()
+        if not header.startswith(MAGIC):
+            self.file.close()
+            raise ValueError(f"{path} is not a flight log")
+        self.channels = tuple(json.loads(header[len(MAGIC):]))
+        self.width = len(self.channels) + 1
+        offset = len(header.encode())
+        size = self.file.seek(0, 2)
+        if size > offset:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            rows = (size - offset) // (8 * self.width)
+            self._data = memoryview(self.map)[offset:offset + 8 * rows * self.width].cast("d")
+        else:
+            self.map = None
+            self._data = memoryview(array("d"))
+
+    def __len__(self):
+        return len(self._data) // self.width
+
+    def column(self, name):
+        """Strided view on a channel, "t" for the time."""
+        index = 0 if name == "t" else self.channels.index(name) + 1
+        return self._data[index::self.width]
+
+    def close(self):
+        self._data.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,242 @@
+"""
+
+Live metrics export
+
+Counters, gauges and histograms of a running simulation, served on a
+localhost HTTP endpoint in the Prometheus text format:
+
+    FLIGHTSIM_METRICS_PORT=9101 python flight_simulation.py
+    curl http://127.0.0.1:9101/metrics
+
+The endpoint is only started when FLIGHTSIM_METRICS_PORT is set. Worker
+processes of a batch serve on a free port each, printed on stderr.
+
+Every thread records into its own accumulator, created the first time the
+thread touches a metric, so recording never takes a lock. Accumulators are
+only summed when the endpoint is scraped.
+
+"""
+
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+
+METRICS_PORT_ENV = "FLIGHTSIM_METRICS_PORT"
+TICK_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class _Metric:
+
+    kind = None
+
+    def __init__(self, name, help, labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self._local = threading.local()
+        self._shards = []
+        with _registry_lock:
+            _registry.append(self)
+
+    def _shard(self):
+        shard = self._new_shard()
+        self._local.shard = shard
+        with _registry_lock:
+            self._shards.append(shard)
+        return shard
+
+
+class Counter(_Metric):
+
+    kind = "counter"
+
+    def _new_shard(self):
+        return [0]
+
+    def inc(self, amount=1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[0] += amount
+
+    def value(self):
+        return sum(shard[0] for shard in list(self._shards))
+
+    def samples(self):
+        yield self.name + _labels(self.labels), self.value()
+
+
+class Gauge(_Metric):
+    """Last value set by any thread, or the value of `function` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=None, function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.function() if self.function is not None else self._value
+
+    def samples(self):
+        yield self.name + _labels(self.labels), self.value()
+
+
+class Histogram(_Metric):
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=TICK_BUCKETS, labels=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labels)
+
+    def _new_shard(self):
+        # Count per bucket (last one above every bound), then sum of the observations
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def samples(self):
+        totals = [0] * (len(self.buckets) + 2)
+        for shard in list(self._shards):
+            for i, v in enumerate(shard):
+                totals[i] += v
+        cumulated = 0
+        for bound, count in zip(self.buckets + ("+Inf",), totals):
+            cumulated += count
+            yield self.name + "_bucket" + _labels({**self.labels, "le": bound}), cumulated
+        yield self.name + "_sum" + _labels(self.labels), totals[-1]
+        yield self.name + "_count" + _labels(self.labels), cumulated
+
+
+def counter(name, help, labels=None):
+    return Counter(name, help, labels)
+
+
+def gauge(name, help, labels=None, function=None):
+    return Gauge(name, help, labels, function)
+
+
+def histogram(name, help, buckets=TICK_BUCKETS, labels=None):
+    return Histogram(name, help, buckets, labels)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    # Series of a metric must follow its description, even if registered later
+    by_name = {}
+    for metric in metrics:
+        by_name.setdefault(metric.name, []).append(metric)
+    for name, series in by_name.items():
+        lines.append(f"# HELP {name} {series[0].help}")
+        lines.append(f"# TYPE {name} {series[0].kind}")
+        for metric in series:
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {value}")
+    return "\n".join(lines) + "\n"
+
+
+## Metrics of the simulation
+
+def _resident_memory():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+_rate_last = [time.perf_counter(), 0]
+
+def _steps_per_second():
+    now = time.perf_counter()
+    steps = PHYSICS_STEPS.value()
+    elapsed = now - _rate_last[0]
+    rate = (steps - _rate_last[1]) / elapsed if elapsed > 0 else 0
+    _rate_last[0] = now
+    _rate_last[1] = steps
+    return rate
+
+PHYSICS_STEPS = counter("flightsim_physics_steps_total", "Physics steps computed.")
+SIMULATED_SECONDS = counter("flightsim_simulated_seconds_total", "Simulated flight time, summed over every plane.")
+STEPS_PER_SECOND = gauge("flightsim_physics_steps_per_second", "Physics steps per second since the previous scrape.", function=_steps_per_second)
+REAL_TIME_FACTOR = gauge("flightsim_real_time_factor", "Simulated seconds per wall clock second.")
+TICK_SECONDS = histogram("flightsim_tick_seconds", "Duration of a simulation loop tick.")
+PFD_FRAME_SECONDS = histogram("flightsim_pfd_frame_seconds", "Duration of a primary flight display frame that redrew something.")
+TICK_LATENESS_SECONDS = histogram("flightsim_tick_lateness_seconds", "Delay between the scheduled and actual start of a tick.")
+STALL_ALARMS = counter("flightsim_alarm_activations_total", "Alarm activations.", {"alarm": "stall_alarm"})
+TOO_LOW_ALARMS = counter("flightsim_alarm_activations_total", "Alarm activations.", {"alarm": "too_low_alarm"})
+RESIDENT_MEMORY = gauge("process_resident_memory_bytes", "Resident memory size in bytes.", function=_resident_memory)
+
+
+## HTTP endpoint
+
+# http.server is only imported when the endpoint is started, batch workers
+# that do not serve metrics do not pay for it
+
+def _handler_class():
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=0, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread, return the port (a free one if port is 0)."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, port), _handler_class())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server.server_address[1]
+
+
+def serve_from_env(worker=False):
+    """Start the endpoint if FLIGHTSIM_METRICS_PORT is set, on a free port for worker processes."""
+    value = os.environ.get(METRICS_PORT_ENV)
+    if not value:
+        return None
+    port = serve(0 if worker else int(value))
+    print(f"metrics on http://127.0.0.1:{port}/metrics (pid {os.getpid()})", file=sys.stderr)
+    return port
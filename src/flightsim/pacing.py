@@ -0,0 +1,143 @@
+"""
+
+Tick pacing monitor
+
+Measures how late each tick of the simulation loop starts compared to when
+it was scheduled, and how long it takes, keeps histograms of both and
+computes the delay until the next tick so that the loop stays on its
+schedule instead of drifting by the cost of every tick.
+
+Under sustained overload the load level goes up one step at a time, and
+down again once the load has been low for a while:
+
+    0  NOMINAL            everything runs at every tick
+    1  SKIP_LABELS        indicators are refreshed less often
+    2  REDUCE_ALARMS      alarms are evaluated less often
+    3  COALESCE_PHYSICS   physics sub-steps are merged into steps of at most
+                          one tick of simulated time
+
+"""
+
+
+import time
+from bisect import bisect_left
+
+
+NOMINAL = 0
+SKIP_LABELS = 1
+REDUCE_ALARMS = 2
+COALESCE_PHYSICS = 3
+LEVEL_NAMES = ("nominal", "skip labels", "reduce alarms", "coalesce physics")
+
+HIGH_LOAD = 0.8 # fraction of the tick period used by the tick or lost waiting for it
+LOW_LOAD = 0.4
+OVERLOAD_TICKS = 10 # consecutive overloaded ticks before shedding more load
+RECOVERY_TICKS = 50 # consecutive quiet ticks before restoring a level
+LOAD_SMOOTHING = 0.2
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Counts of durations per bucket, the last bucket catching everything above BUCKETS_MS."""
+
+    def __init__(self, bounds_ms=BUCKETS_MS):
+        self.bounds = [b / 1000 for b in bounds_ms]
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, in seconds."""
+        rank = q / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return 0
+
+    def __str__(self):
+        if not self.total:
+            return "no samples"
+        return (f"mean {1000 * self.sum / self.total:.1f} ms, p50 <= {1000 * self.percentile(50):.0f} ms, "
+                f"p99 <= {1000 * self.percentile(99):.0f} ms, max {1000 * self.max:.1f} ms")
+
+
+class TickMonitor:
+
+    def __init__(self, period):
+        self.period = period # s
+        self.level = NOMINAL
+        self.load = 0 # smoothed fraction of the period
+        self.lateness = Histogram() # start of the tick after the time it was scheduled for
+        self.cost = Histogram() # duration of the tick
+        self.overruns = 0 # ticks longer than the period
+        self.ticks = 0
+        self.last_lateness = 0 # s
+        self.last_cost = 0 # s
+        self._due = None
+        self._started = None
+        self._previous_start = None
+        self._overloaded = 0
+        self._quiet = 0
+
+    def begin(self):
+        """Call at the start of a tick, return the time elapsed since the previous tick started."""
+        now = time.perf_counter()
+        if self._due is None:
+            self._due = now
+        late = max(0, now - self._due)
+        self.lateness.add(late)
+        elapsed = now - self._previous_start if self._previous_start is not None else self.period
+        self._previous_start = now
+        self._started = now
+        self.last_lateness = late
+        return elapsed
+
+    def end(self):
+        """Call at the end of a tick, return the delay before the next one in milliseconds."""
+        now = time.perf_counter()
+        cost = now - self._started
+        self.cost.add(cost)
+        self.last_cost = cost
+        self.ticks += 1
+        if cost > self.period:
+            self.overruns += 1
+        self.load += LOAD_SMOOTHING * ((cost + self.last_lateness) / self.period - self.load)
+        self._update_level()
+        self._due += self.period
+        if self._due < now:
+            # Too late to catch up tick by tick, the caller covers the elapsed time instead
+            self._due = now
+        return int(1000 * (self._due - now))
+
+    def _update_level(self):
+        if self.load > HIGH_LOAD:
+            self._overloaded += 1
+            self._quiet = 0
+            if self._overloaded >= OVERLOAD_TICKS and self.level < COALESCE_PHYSICS:
+                self.level += 1
+                self._overloaded = 0
+        elif self.load < LOW_LOAD:
+            self._quiet += 1
+            self._overloaded = 0
+            if self._quiet >= RECOVERY_TICKS and self.level > NOMINAL:
+                self.level -= 1
+                self._quiet = 0
+        else:
+            self._overloaded = 0
+            self._quiet = 0
+
+    def report(self):
+        return (f"{self.ticks} ticks, {self.overruns} overruns, load level {LEVEL_NAMES[self.level]}\n"
+                f"lateness: {self.lateness}\n"
+                f"cost: {self.cost}")
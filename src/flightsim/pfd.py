@@ -0,0 +1,351 @@
+"""
+
+Primary flight display
+
+Artificial horizon, speed and altitude tapes, heading tape and throttle
+gauge drawn on a Tk canvas. Every item is created once and then only moved
+or reconfigured, and an instrument is only touched when the value it shows
+changed by at least a pixel, so that Tk only repaints the regions that
+moved. Tick marks, the roll scale and the pitch ladder are laid out once
+when the display is built.
+
+"""
+
+
+import math
+import time
+import tkinter as tk
+
+from . import metrics
+from .pacing import Histogram
+
+
+WIDTH = 480 # px
+HEIGHT = 300 # px
+
+SKY = "#3a7bd5"
+GROUND = "#8b5a2b"
+TAPE_BACKGROUND = "#303030"
+SYMBOL = "yellow"
+FONT = ("Helvetica", 9)
+READOUT_FONT = ("Helvetica", 12, "bold")
+
+# Artificial horizon
+HORIZON_CENTER = (200, 130) # px
+HORIZON_RADIUS = 110 # px, half side of the square
+PIXELS_PER_PITCH_DEG = 4
+LADDER_STEP = 5 # deg
+LADDER_MAX = 30 # deg
+LADDER_RANGE = HORIZON_RADIUS - 25 # px from the center beyond which ladder lines are hidden
+ROLL_SCALE = (-60, -45, -30, -20, -10, 0, 10, 20, 30, 45, 60) # deg
+
+# Tapes: box, graduation step, labelled graduations, pixels per unit
+SPEED_TAPE = ((10, 20, 80, 240), 10, 2, 2.0) # m.s^(-1)
+ALTITUDE_TAPE = ((320, 20, 400, 240), 100, 2, 0.3) # ft
+HEADING_TAPE = ((90, 255, 310, 290), 5, 6, 3.0) # deg
+THROTTLE_GAUGE = (430, 20, 450, 240) # px
+MINOR_TICK = 6 # px
+MAJOR_TICK = 12 # px
+
+
+## Geometry
+
+def _clip_polygon(points, origin, normal):
+    """Part of a convex polygon on the side of the line through origin where (p - origin).normal >= 0."""
+    clipped = []
+    for i, p in enumerate(points):
+        q = points[(i + 1) % len(points)]
+        dp = (p[0] - origin[0])*normal[0] + (p[1] - origin[1])*normal[1]
+        dq = (q[0] - origin[0])*normal[0] + (q[1] - origin[1])*normal[1]
+        if dp >= 0:
+            clipped.append(p)
+        if (dp >= 0) != (dq >= 0):
+            f = dp / (dp - dq)
+            clipped.append((p[0] + f*(q[0] - p[0]), p[1] + f*(q[1] - p[1])))
+    return clipped
+
+
+def _clip_segment(p, q, box):
+    """Part of the segment pq inside the box (x0, y0, x1, y1), None if outside (Liang-Barsky)."""
+    x0, y0, x1, y1 = box
+    dx = q[0] - p[0]
+    dy = q[1] - p[1]
+    t0, t1 = 0.0, 1.0
+    for d, distance in ((-dx, p[0] - x0), (dx, x1 - p[0]), (-dy, p[1] - y0), (dy, y1 - p[1])):
+        if d == 0:
+            if distance < 0:
+                return None
+            continue
+        t = distance / d
+        if d < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+    if t0 > t1:
+        return None
+    return (p[0] + t0*dx, p[1] + t0*dy), (p[0] + t1*dx, p[1] + t1*dy)
+
+
+def _flatten(points):
+    return [c for p in points for c in p]
+
+
+## Instruments
+
+class Horizon:
+    """Artificial horizon with pitch ladder and roll pointer."""
+
+    def __init__(self, canvas, center=HORIZON_CENTER, radius=HORIZON_RADIUS):
+        self.canvas = canvas
+        self.center = cx, cy = center
+        self.radius = r = radius
+        self.box = (cx - r, cy - r, cx + r, cy + r)
+        self.square = [(cx - r, cy - r), (cx + r, cy - r), (cx + r, cy + r), (cx - r, cy + r)]
+        self.shown = None # (pitch, roll) drawn
+
+        canvas.create_rectangle(*self.box, fill=SKY, outline="")
+        self.ground = canvas.create_polygon(*_flatten(self.square), fill=GROUND, outline="")
+        self.ground_visible = True
+        self.horizon = canvas.create_line(0, 0, 0, 0, fill="white", width=2)
+        self.horizon_visible = True
+
+        # Pitch ladder, half width and label of every line in the level frame
+        self.ladder = []
+        for pitch in range(-LADDER_MAX, LADDER_MAX + 1, LADDER_STEP):
+            if pitch == 0:
+                continue
+            half_width = 40 if pitch % 10 == 0 else 20
+            line = canvas.create_line(0, 0, 0, 0, fill="white")
+            label = canvas.create_text(0, 0, text=str(abs(pitch)), fill="white", font=FONT) if pitch % 10 == 0 else None
+            self.ladder.append([pitch, half_width, line, label, True])
+
+        # Roll scale, fixed, and roll pointer turning with the horizon
+        for angle in ROLL_SCALE:
+            a = math.radians(angle)
+            inner = r - (14 if angle % 30 == 0 else 8)
+            canvas.create_line(cx + inner*math.sin(a), cy - inner*math.cos(a),
+                               cx + (r - 2)*math.sin(a), cy - (r - 2)*math.cos(a), fill="white")
+        self.pointer_shape = [(0, -(r - 16)), (-6, -(r - 26)), (6, -(r - 26))] # level frame, relative to the center
+        self.pointer = canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="white", outline="")
+
+        # Fixed aircraft symbol, drawn last to stay on top
+        for x0, y0, x1, y1 in ((-60, 0, -20, 0), (-20, 0, -20, 8), (20, 0, 60, 0), (20, 0, 20, 8)):
+            canvas.create_line(cx + x0, cy + y0, cx + x1, cy + y1, fill=SYMBOL, width=3)
+        canvas.create_rectangle(cx - 2, cy - 2, cx + 2, cy + 2, fill=SYMBOL, outline="")
+
+    def _show(self, item, visible):
+        self.canvas.itemconfigure(item, state=tk.NORMAL if visible else tk.HIDDEN)
+
+    def set(self, pitch_deg, roll_deg):
+        """Move the horizon, return False if nothing had to be redrawn."""
+        if (pitch_deg, roll_deg) == self.shown:
+            return False
+        self.shown = (pitch_deg, roll_deg)
+        canvas = self.canvas
+        cx, cy = self.center
+        roll = math.radians(roll_deg)
+        # Along the horizon, and towards the ground, on screen (y downwards)
+        ux, uy = math.cos(roll), -math.sin(roll)
+        nx, ny = math.sin(roll), math.cos(roll)
+
+        def place(x, y):
+            return cx + x*ux + y*nx, cy + x*uy + y*ny
+
+        offset = pitch_deg * PIXELS_PER_PITCH_DEG
+        origin = place(0, offset)
+        ground = _clip_polygon(self.square, origin, (nx, ny))
+        if len(ground) >= 3:
+            canvas.coords(self.ground, *_flatten(ground))
+        if (len(ground) >= 3) != self.ground_visible:
+            self.ground_visible = len(ground) >= 3
+            self._show(self.ground, self.ground_visible)
+
+        span = 2 * self.radius
+        segment = _clip_segment(place(-span, offset), place(span, offset), self.box)
+        if segment is not None:
+            canvas.coords(self.horizon, *_flatten(segment))
+        if (segment is not None) != self.horizon_visible:
+            self.horizon_visible = segment is not None
+            self._show(self.horizon, self.horizon_visible)
+
+        for rung in self.ladder:
+            pitch, half_width, line, label, visible = rung
+            y = (pitch_deg - pitch) * PIXELS_PER_PITCH_DEG
+            if abs(y) > LADDER_RANGE:
+                if visible:
+                    rung[4] = False
+                    self._show(line, False)
+                    if label is not None:
+                        self._show(label, False)
+                continue
+            canvas.coords(line, *place(-half_width, y), *place(half_width, y))
+            if label is not None:
+                canvas.coords(label, *place(half_width + 12, y))
+            if not visible:
+                rung[4] = True
+                self._show(line, True)
+                if label is not None:
+                    self._show(label, True)
+
+        canvas.coords(self.pointer, *_flatten(place(x, y) for x, y in self.pointer_shape))
+        return True
+
+
+class Tape:
+    """Moving graduated scale with a fixed readout of the current value."""
+
+    def __init__(self, canvas, box, step, label_every, pixels_per_unit, label=str, wrap=None):
+        self.canvas = canvas
+        self.step = step
+        self.label_every = label_every
+        self.pixels_per_unit = pixels_per_unit
+        self.label = label
+        self.wrap = wrap # period of the graduation labels, 360 for headings
+        x0, y0, x1, y1 = box
+        self.vertical = vertical = y1 - y0 > x1 - x0
+        self.center = (y0 + y1) / 2 if vertical else (x0 + x1) / 2
+        self.low, self.high = (y0, y1) if vertical else (x0, x1)
+        self.shown = None # (graduation at the center, pixel offset) drawn
+        self.readout_text = None
+
+        canvas.create_rectangle(*box, fill=TAPE_BACKGROUND, outline="white")
+
+        # Tick geometry across the tape, computed once: ticks on the side of the
+        # artificial horizon, or at the top of the heading tape
+        if vertical:
+            right = x1 < HORIZON_CENTER[0]
+            edge = x1 if right else x0
+            sign = -1 if right else 1
+            self.minor = (edge, edge + sign*MINOR_TICK)
+            self.major = (edge, edge + sign*MAJOR_TICK)
+            self.label_across = edge + sign*(MAJOR_TICK + 16)
+        else:
+            self.minor = (y0, y0 + MINOR_TICK)
+            self.major = (y0, y0 + MAJOR_TICK)
+            self.label_across = y0 + MAJOR_TICK + 8
+
+        self.count = int((self.high - self.low) / 2 / (step * pixels_per_unit)) + 1 # graduations on each side
+        self.ticks = [canvas.create_line(0, 0, 0, 0, fill="white") for _ in range(2*self.count + 1)]
+        self.labels = [canvas.create_text(0, 0, text="", fill="white", font=FONT) for _ in self.ticks]
+        self.label_texts = [""] * len(self.ticks)
+        self.visible = [True] * len(self.ticks)
+
+        # Readout over the center of the tape
+        if vertical:
+            self.readout_box = (x0 - 2, self.center - 11, x1 + 2, self.center + 11)
+            readout_position = ((x0 + x1) / 2, self.center)
+        else:
+            self.readout_box = (self.center - 22, y1 - 18, self.center + 22, y1 + 2)
+            readout_position = (self.center, y1 - 8)
+        canvas.create_rectangle(*self.readout_box, fill="black", outline="white")
+        self.readout = canvas.create_text(*readout_position, text="", fill="white", font=READOUT_FONT)
+
+    def _position(self, k, offset):
+        along = (k - self.count) * self.step * self.pixels_per_unit - offset
+        return self.center - along if self.vertical else self.center + along
+
+    def set(self, value, text):
+        """Scroll to value and show text in the readout, return False if nothing had to be redrawn."""
+        canvas = self.canvas
+        redrawn = False
+        if text != self.readout_text:
+            self.readout_text = text
+            canvas.itemconfigure(self.readout, text=text)
+            redrawn = True
+
+        base = round(value / self.step)
+        offset = round((value - base*self.step) * self.pixels_per_unit)
+        if (base, offset) == self.shown:
+            return redrawn
+        self.shown = (base, offset)
+
+        for k, (tick, label) in enumerate(zip(self.ticks, self.labels)):
+            position = self._position(k, offset)
+            visible = self.low <= position <= self.high
+            if visible != self.visible[k]:
+                self.visible[k] = visible
+                state = tk.NORMAL if visible else tk.HIDDEN
+                canvas.itemconfigure(tick, state=state)
+                canvas.itemconfigure(label, state=state)
+            if not visible:
+                continue
+            graduation = base + k - self.count
+            major = graduation % self.label_every == 0
+            a0, a1 = self.major if major else self.minor
+            if self.vertical:
+                canvas.coords(tick, a0, position, a1, position)
+            else:
+                canvas.coords(tick, position, a0, position, a1)
+            label_text = ""
+            if major:
+                graduation_value = graduation * self.step
+                if self.wrap is not None:
+                    graduation_value %= self.wrap
+                label_text = self.label(graduation_value)
+                if self.vertical:
+                    canvas.coords(label, self.label_across, position)
+                else:
+                    canvas.coords(label, position, self.label_across)
+            if label_text != self.label_texts[k]:
+                self.label_texts[k] = label_text
+                canvas.itemconfigure(label, text=label_text)
+        return True
+
+
+class ThrottleGauge:
+
+    def __init__(self, canvas, box=THROTTLE_GAUGE):
+        self.canvas = canvas
+        self.box = box
+        self.shown = None
+        x0, y0, x1, y1 = box
+        canvas.create_rectangle(*box, fill=TAPE_BACKGROUND, outline="white")
+        self.bar = canvas.create_rectangle(x0 + 2, y1, x1 - 2, y1, fill="white", outline="")
+        canvas.create_text((x0 + x1) / 2, y1 + 12, text="THR", fill="white", font=FONT)
+        self.text = canvas.create_text((x0 + x1) / 2, y1 + 26, text="", fill="white", font=FONT)
+
+    def set(self, throttle):
+        if throttle == self.shown:
+            return False
+        self.shown = throttle
+        x0, y0, x1, y1 = self.box
+        self.canvas.coords(self.bar, x0 + 2, y1 - throttle*(y1 - y0), x1 - 2, y1)
+        self.canvas.itemconfigure(self.text, text=f"{throttle:.2f}")
+        return True
+
+
+def _heading_label(value):
+    return {0: "N", 90: "E", 180: "S", 270: "W"}.get(value, str(value // 10))
+
+
+class PrimaryFlightDisplay:
+
+    def __init__(self, parent):
+        self.canvas = canvas = tk.Canvas(parent, width=WIDTH, height=HEIGHT, bg="black", highlightthickness=0)
+        self.horizon = Horizon(canvas)
+        self.speed = Tape(canvas, *SPEED_TAPE)
+        self.altitude = Tape(canvas, *ALTITUDE_TAPE)
+        self.heading = Tape(canvas, *HEADING_TAPE, label=_heading_label, wrap=360)
+        self.throttle = ThrottleGauge(canvas)
+        self.pitch_text = canvas.create_text(45, 272, text="", fill="white", font=FONT)
+        self.roll_text = canvas.create_text(360, 272, text="", fill="white", font=FONT)
+        self.angles_shown = None
+        self.frame_cost = Histogram() # duration of the frames that redrew something
+
+    def draw(self, pitch_deg, roll_deg, throttle, altitude_feet, speed, heading_deg):
+        """Update the instruments whose value changed, return how many were redrawn."""
+        started = time.perf_counter()
+        redrawn = self.horizon.set(pitch_deg, roll_deg)
+        redrawn += self.speed.set(speed, str(speed))
+        redrawn += self.altitude.set(altitude_feet, str(altitude_feet))
+        redrawn += self.heading.set(heading_deg, f"{round(heading_deg) % 360:03d}")
+        redrawn += self.throttle.set(throttle)
+        if (pitch_deg, roll_deg) != self.angles_shown:
+            self.angles_shown = (pitch_deg, roll_deg)
+            self.canvas.itemconfigure(self.pitch_text, text=f"PITCH {pitch_deg}")
+            self.canvas.itemconfigure(self.roll_text, text=f"ROLL {roll_deg}")
+        if redrawn:
+            cost = time.perf_counter() - started
+            self.frame_cost.add(cost)
+            metrics.PFD_FRAME_SECONDS.observe(cost)
+        return redrawn
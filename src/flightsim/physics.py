@@ -0,0 +1,349 @@
+import math
+
+## Environment constants
+
+G = 9.81 # in m/s^2
+
+## Plane constants
+
+MASS = 100_000 # in kg
+NB_ENGINES = 2
+ENGINE_THRUST = 180_000 # in N
+WING_SURFACE = 180 # in m^2
+STALL_ANGLE_DEG = 15 # in degrees
+STALL_ANGLE = STALL_ANGLE_DEG * math.pi/180
+CL_MAX = 1.3
+CD0 = 0.02 # zero-lift drag coefficient
+CD_K = 0.06 # induced drag factor
+STATIC_MARGIN = 0.05*5 # in meters
+
+## Plane main variables
+
+pitch = 12 * math.pi/180 #radian
+pitch_deg = 12 # degrees
+roll = 0 #radian
+roll_deg = 0 #degrees
+altitude = 1000 #metres
+altitude_feet = 3000 #feet
+heading = 0 #radian
+heading_deg = 0 # degrees
+north = 0 #metres
+east = 0 #metres
+vz = 0 #(vertical speed, m/s)
+vx = 100 #(horizontal speed, m/s)
+throttle = 1 #Between 0 and 1
+
+## Plane computed variables
+speed = 100
+aoa = 0 #radian
+cl = 0 
+cd = 0 
+thrust = 0
+lift = 0
+drag = 0
+slope = 0
+
+rho = 0
+
+## Weather, still air and standard atmosphere by default
+
+wind_north = 0 #m/s
+wind_east = 0 #m/s
+wind_up = 0 #m/s
+air_temperature = None #kelvins, None for standard atmosphere
+vx_air = 100 #(horizontal airspeed, m/s)
+vz_air = 0 #(vertical airspeed, m/s)
+
+def compute_rho(alt, temperature=None):
+    if temperature is None:
+        temperature = 288.15 - 0.0065*alt
+    return 352.995 * (1-0.0000225577*alt)**5.25516 / temperature
+
+def update_rho(alt):
+    global rho
+    rho = compute_rho(alt, air_temperature)
+
+def update_weather(probe, t):
+    global wind_north, wind_east, wind_up, air_temperature
+    wind_north, wind_east, wind_up, air_temperature = probe.sample(t, north, east, altitude)
+
+def update_air_velocity():
+    global vx_air, vz_air
+    vx_air = vx - (wind_north * math.cos(heading) + wind_east * math.sin(heading))
+    vz_air = vz - wind_up
+
+def update_speed():
+    global speed
+    speed = math.sqrt(vz_air**2 + vx_air**2)
+
+def update_aoa():
+    global aoa
+    aoa = (pitch - math.asin(vz_air/speed))*math.cos(roll)
+
+# Passing points of the Cl curve, in radians
+def make_passing_points(stall_angle_deg, cl_max):
+    return [(a*math.pi/180, c) for (a, c) in [
+        (0,0),
+        (stall_angle_deg,cl_max),
+        (1.2*stall_angle_deg,0.8),
+        (40,0.8),
+        (90,0)
+    ]]
+
+PASSING_POINTS = make_passing_points(STALL_ANGLE_DEG, CL_MAX)
+
+def compute_cl(aoa, passing_points=PASSING_POINTS):
+    if aoa < 0:
+        return -compute_cl(-aoa, passing_points)
+    for i in range(1,len(passing_points)):
+        (a,c) = passing_points[i]
+        if aoa < a:
+            (a0,c0) = passing_points[i-1]
+            return (c-c0)/(a-a0)*(aoa-a0)+c0
+        
+    return 0
+
+def update_cl(aoa):
+    global cl
+    cl = compute_cl(aoa)
+
+def polar(cl, cd0=CD0, cd_k=CD_K):
+    return cd0 + cd_k*cl**2
+
+def compute_cd(aoa, cl, stall_angle=STALL_ANGLE, cl_max=CL_MAX):
+    if abs(aoa) < stall_angle:
+        return polar(cl)
+    
+    return (1.5-polar(cl_max))/(math.pi/2 - stall_angle)*(abs(aoa) - stall_angle) + polar(cl_max)
+
+def update_cd():
+    global cd
+    cd = compute_cd(aoa, cl)
+
+RHO_0 = compute_rho(0)
+
+def update_thrust():
+    global thrust
+    thrust = NB_ENGINES * throttle * ENGINE_THRUST * rho / RHO_0
+
+def update_lift():
+    global lift
+    lift = 1/2 * rho * WING_SURFACE * speed**2 * cl
+
+def update_drag():
+    global drag
+    drag = 1/2 * rho * WING_SURFACE * speed**2 * cd
+
+def update_slope():
+    global slope
+    slope = pitch - aoa
+
+## Plane variable update functions
+
+def update_vz(dt):
+    global vz
+    vertical_force = (lift * math.cos(slope) - drag * math.sin(slope))*math.cos(roll) + thrust * math.sin(pitch) - MASS * G
+    vz += vertical_force * dt / MASS
+
+def update_altitude(dt):
+    global altitude
+    altitude += vz * dt
+
+def update_altitude_feet():
+    global altitude_feet
+    altitude_feet = int(3*altitude)
+
+def update_vx(dt):
+    global vx
+    horizontal_force = lift * -math.sin(slope) - drag * math.cos(slope) + thrust * math.cos(pitch)
+    vx += horizontal_force * dt / MASS
+
+def update_heading(dt):
+    global heading, heading_deg
+    heading += dt * STATIC_MARGIN * math.sin(roll) * lift
+    
+def update_position(dt):
+    global north, east
+    crosswind = wind_east * math.cos(heading) - wind_north * math.sin(heading)
+    north += (vx * math.cos(heading) - crosswind * math.sin(heading)) * dt
+    east += (vx * math.sin(heading) + crosswind * math.cos(heading)) * dt
+
+def heading_rad2deg():
+    global heading_deg
+    heading_deg = heading * 180 / math.pi
+
+def pitch_deg2rad():
+    global pitch
+    pitch = pitch_deg * math.pi / 180
+
+def roll_deg2rad():
+    global roll
+    roll = roll_deg * math.pi / 180
+
+## General update function
+
+def update_all(dt, alt, aoa): #dt is supposed to be small
+    update_rho(alt)
+    update_air_velocity()
+    update_speed()
+    update_aoa()
+    update_cl(aoa)
+    update_cd()
+    update_thrust()
+    update_lift()
+    update_drag()
+    update_slope()
+    update_vz(dt)
+    update_altitude(dt)
+    update_altitude_feet()
+    update_vx(dt)
+    update_heading(dt)
+    update_position(dt)
+
+def ground_velocity(vx, heading, wind_north=0, wind_east=0):
+    """North and east ground speeds, drift by the crosswind included, as in update_position."""
+    crosswind = wind_east * math.cos(heading) - wind_north * math.sin(heading)
+    return (vx * math.cos(heading) - crosswind * math.sin(heading),
+            vx * math.sin(heading) + crosswind * math.cos(heading))
+
+## Plane parameters
+
+# step() takes the plane constants from a parameter dictionary, so that
+# several configurations can be simulated side by side. Keys are the names
+# of the module constants.
+
+PARAMETERS = ("MASS", "NB_ENGINES", "ENGINE_THRUST", "WING_SURFACE", "STALL_ANGLE_DEG", "CL_MAX", "CD0", "CD_K", "STATIC_MARGIN")
+
+def make_params(**overrides):
+    unknown = set(overrides) - set(PARAMETERS)
+    if unknown:
+        raise KeyError(f"unknown plane parameters: {', '.join(sorted(unknown))}")
+    params = {name: globals()[name] for name in PARAMETERS}
+    params.update(overrides)
+    # Derived constants, computed once per configuration instead of at every step
+    stall_angle = params["STALL_ANGLE_DEG"] * math.pi/180
+    cd_stall = polar(params["CL_MAX"], params["CD0"], params["CD_K"])
+    params["STALL_ANGLE"] = stall_angle
+    params["PASSING_POINTS"] = make_passing_points(params["STALL_ANGLE_DEG"], params["CL_MAX"])
+    params["CD_STALL"] = cd_stall
+    params["CD_STALL_SLOPE"] = (1.5-cd_stall)/(math.pi/2 - stall_angle)
+    params["MAX_THRUST_PER_RHO"] = params["NB_ENGINES"] * params["ENGINE_THRUST"] / RHO_0
+    params["HALF_WING_SURFACE"] = 1/2 * params["WING_SURFACE"]
+    return params
+
+DEFAULT_PARAMS = make_params()
+
+## Re-entrant step function
+
+# The functions above work on the module variables, so only one plane can be
+# simulated at a time. step() runs the same model on a state dictionary and
+# can be used from several threads, for look-ahead rollouts or for batches.
+
+def make_state(pitch, roll, throttle, altitude, vz, vx, heading=0, north=0, east=0, aoa=0, t=0):
+    return {
+        "t": t, "pitch": pitch, "roll": roll, "throttle": throttle,
+        "altitude": altitude, "altitude_feet": int(3*altitude),
+        "vz": vz, "vx": vx, "heading": heading, "north": north, "east": east,
+        "speed": math.sqrt(vz**2 + vx**2), "aoa": aoa, "cl": 0, "cd": 0,
+        "thrust": 0, "lift": 0, "drag": 0, "slope": 0, "rho": 0,
+    }
+
+def step(state, dt, weather=None, params=DEFAULT_PARAMS):
+    """Advance a state made by make_state of dt seconds, in place, same model as update_all."""
+    mass = params["MASS"]
+    stall_angle = params["STALL_ANGLE"]
+    pitch = state["pitch"]
+    roll = state["roll"]
+    heading = state["heading"]
+    altitude = state["altitude"]
+    vz = state["vz"]
+    vx = state["vx"]
+    wind_north = wind_east = wind_up = 0
+    temperature = None
+    if weather is not None:
+        wind_north, wind_east, wind_up, temperature = weather.sample(state["t"], state["north"], state["east"], altitude)
+
+    rho = compute_rho(altitude, temperature)
+    cos_heading = math.cos(heading)
+    sin_heading = math.sin(heading)
+    vx_air = vx - (wind_north * cos_heading + wind_east * sin_heading)
+    vz_air = vz - wind_up
+    speed = math.sqrt(vz_air**2 + vx_air**2)
+    # Like update_all, lift uses the angle of attack of the previous step
+    cl = compute_cl(state["aoa"], params["PASSING_POINTS"])
+    aoa = (pitch - math.asin(vz_air/speed))*math.cos(roll)
+    if abs(aoa) < stall_angle:
+        cd = params["CD0"] + params["CD_K"]*cl**2
+    else:
+        cd = params["CD_STALL_SLOPE"]*(abs(aoa) - stall_angle) + params["CD_STALL"]
+    thrust = state["throttle"] * params["MAX_THRUST_PER_RHO"] * rho
+    dynamic_pressure = params["HALF_WING_SURFACE"] * rho * speed**2
+    lift = dynamic_pressure * cl
+    drag = dynamic_pressure * cd
+    slope = pitch - aoa
+
+    vertical_force = (lift * math.cos(slope) - drag * math.sin(slope))*math.cos(roll) + thrust * math.sin(pitch) - mass * G
+    vz += vertical_force * dt / mass
+    altitude += vz * dt
+    horizontal_force = lift * -math.sin(slope) - drag * math.cos(slope) + thrust * math.cos(pitch)
+    vx += horizontal_force * dt / mass
+    heading += dt * params["STATIC_MARGIN"] * math.sin(roll) * lift
+    cos_heading = math.cos(heading)
+    sin_heading = math.sin(heading)
+    crosswind = wind_east * cos_heading - wind_north * sin_heading
+
+    state["t"] += dt
+    state["north"] += (vx * cos_heading - crosswind * sin_heading) * dt
+    state["east"] += (vx * sin_heading + crosswind * cos_heading) * dt
+    state["altitude"] = altitude
+    state["altitude_feet"] = int(3*altitude)
+    state["vz"] = vz
+    state["vx"] = vx
+    state["heading"] = heading
+    state["speed"] = speed
+    state["aoa"] = aoa
+    state["cl"] = cl
+    state["cd"] = cd
+    state["thrust"] = thrust
+    state["lift"] = lift
+    state["drag"] = drag
+    state["slope"] = slope
+    state["rho"] = rho
+    return state
+
+
+## Tests
+
+# import matplotlib.pyplot as plt
+
+# # Cl Cd curves
+
+# old_aoa = aoa
+# aoa = -math.pi/2
+# alpha = [i/10 for i in range(-900,900)]
+# l = []
+# d = []
+# for i in alpha:
+#     aoa = i * math.pi/180
+#     update_cd()
+#     update_cl()
+#     l.append(cl)
+#     d.append(cd)
+# aoa = old_aoa
+
+# plt.figure()
+# plt.plot(alpha, l)
+# plt.plot(alpha, d)
+# plt.show()
+
+# # Simulation
+
+# Recording every step in lists does not scale to long flights: record
+# the telemetry with flightsim.flightlog.Recorder and plot it with flightsim.report, e.g.
+
+# from flightsim.analytics import telemetry, run
+# from flightsim.flightlog import Recorder
+
+# run(telemetry(make_state(pitch, roll, throttle, altitude, vz, vx), 0.1, 6000), Recorder("flight.log"))
+
+# then: python -m flightsim.report flight.log -o flight.png
@@ -0,0 +1,161 @@
+"""
+
+Background trajectory predictor
+
+A worker thread keeps rolling the physics forward from the latest state of
+the plane, assuming the controls stay as they are, and publishes the
+predicted altitude and speed over the next couple of minutes together with
+the first time the too low alarm would ring.
+
+While the controls do not change, the previous rollout is still valid: it is
+only trimmed and extended to cover the new horizon. A change of controls
+(restart) cancels the rollout in progress and starts a new one.
+
+"""
+
+
+import threading
+from collections import deque
+
+from .alarms import TOO_LOW_RULE, raise_condition
+from .physics import step
+from .terrain import TerrainDatabase
+from . import metrics
+
+
+HORIZON = 120 # s
+CANCEL_CHECK_STEPS = 20 # rollout steps between two cancellation checks
+
+# Largest gap between the rollout and the actual plane before starting over
+ALTITUDE_TOLERANCE = 10 # m
+VZ_TOLERANCE = 2 # m/s
+VX_TOLERANCE = 2 # m/s
+
+_too_low = raise_condition(TOO_LOW_RULE)
+
+
+def _controls(state):
+    return (state["pitch"], state["roll"], state["throttle"])
+
+
+class Prediction:
+    """Immutable rollout: points of (t, altitude, speed, vx, vz, too_low) from t0."""
+
+    def __init__(self, t0, points):
+        self.t0 = t0
+        self.points = points
+        # First time the too low alarm would ring, None if not within the horizon
+        self.too_low_time = next((p[0] for p in points if p[5]), None)
+
+    def at(self, ahead):
+        """Predicted point `ahead` seconds after the state the prediction starts from."""
+        t = self.t0 + ahead
+        for point in self.points:
+            if point[0] >= t:
+                return point
+        return self.points[-1] if self.points else None
+
+    def time_to_too_low(self):
+        if self.too_low_time is None:
+            return None
+        return self.too_low_time - self.t0
+
+
+class TrajectoryPredictor:
+
+    def __init__(self, dt, horizon=HORIZON, terrain_dir=None, weather_field=None):
+        self.dt = dt
+        self.horizon = horizon
+        self.terrain_dir = terrain_dir
+        self.weather_field = weather_field
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._generation = 0
+        self._pending = None
+        self._prediction = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="trajectory-predictor", daemon=True)
+        self._thread.start()
+
+    ## Interface for the simulation loop, never blocking
+
+    def update(self, state):
+        """Post the current state of the plane, the rollout is reused if the controls did not change."""
+        with self._lock:
+            self._pending = dict(state)
+        self._wake.set()
+
+    def restart(self, state):
+        """Cancel the rollout in progress and start a new one from this state."""
+        with self._lock:
+            self._generation += 1
+            self._pending = dict(state)
+        self._wake.set()
+
+    def prediction(self):
+        return self._prediction
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    ## Worker thread
+
+    def _run(self):
+        terrain = TerrainDatabase(self.terrain_dir) if self.terrain_dir is not None else None
+        weather = self.weather_field.probe() if self.weather_field is not None else None
+        points = deque()
+        tail = None # full state at the end of the rollout
+        generation = None
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                state = self._pending
+                self._pending = None
+                if self._generation != generation:
+                    generation = self._generation
+                    tail = None
+            if state is None:
+                continue
+
+            t0 = state["t"]
+            while points and points[0][0] < t0 - self.dt / 2:
+                points.popleft()
+            if tail is not None and (_controls(tail) != _controls(state) or not points or not self._on_track(points[0], state)):
+                tail = None
+            if tail is None:
+                tail = dict(state)
+                points.clear()
+                points.append(self._point(tail, terrain))
+
+            cancelled = False
+            steps = 0
+            while tail["t"] < t0 + self.horizon:
+                step(tail, self.dt, weather)
+                points.append(self._point(tail, terrain))
+                steps += 1
+                if steps % CANCEL_CHECK_STEPS == 0 and (self._generation != generation or not self._running):
+                    cancelled = True
+                    break
+            metrics.PHYSICS_STEPS.inc(steps)
+            if cancelled:
+                continue
+            self._prediction = Prediction(t0, tuple(points))
+
+        if terrain is not None:
+            terrain.close()
+
+    @staticmethod
+    def _on_track(point, state):
+        return (abs(point[1] - state["altitude"]) < ALTITUDE_TOLERANCE
+                and abs(point[4] - state["vz"]) < VZ_TOLERANCE
+                and abs(point[3] - state["vx"]) < VX_TOLERANCE)
+
+    @staticmethod
+    def _point(state, terrain):
+        # Rule of the too low alarm, the clearance at the predicted point
+        ground = terrain.height_at(state["north"], state["east"]) if terrain is not None else 0
+        too_low = _too_low({"vz": state["vz"], "height_feet": state["altitude_feet"] - int(3*ground),
+                            "clearance_ahead": state["altitude"] - ground})
+        return (state["t"], state["altitude"], state["speed"], state["vx"], state["vz"], too_low)
@@ -0,0 +1,247 @@
+"""
+
+Flight reports
+
+Renders multi-panel plots of recorded flight logs (see flightlog.py): the
+channels of one flight, or percentile bands of an ensemble of flights.
+Logs are read lazily and every channel is reduced to a few thousand points
+before plotting:
+
+- a single flight is cut in buckets of equal length, each bucket keeping
+  its minimum and maximum so that peaks survive, and the result is reduced
+  to the requested number of points with Largest-Triangle-Three-Buckets;
+- an ensemble is cut in buckets of equal duration, each flight giving the
+  mean of every bucket, and the percentiles are taken across flights.
+
+Files and channels are processed in parallel. Usage:
+
+    python -m flightsim.report flight.log -o flight.png
+    python -m flightsim.report --ensemble logs/*.log -o ensemble.png
+
+matplotlib is only needed to render, not to downsample.
+
+"""
+
+
+import argparse
+from bisect import bisect_left
+from multiprocessing import Pool
+
+from .flightlog import FlightLog
+
+
+POINTS = 2000
+ENSEMBLE_BUCKETS = 500
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Channels plotted together in one panel
+PANELS = (("altitude",), ("speed",), ("thrust",), ("vz",), ("vx",), ("aoa",), ("slope",), ("cl", "cd"), ("lift",), ("drag",))
+
+
+## Downsampling
+
+def minmax_buckets(t, y, buckets):
+    """Minimum and maximum of each of `buckets` buckets of equal length, in time order."""
+    n = len(y)
+    if n <= 2 * buckets:
+        return t.tolist(), y.tolist()
+    ts = []
+    ys = []
+    for b in range(buckets):
+        start = b * n // buckets
+        stop = (b + 1) * n // buckets
+        chunk = y[start:stop].tolist()
+        low = chunk.index(min(chunk))
+        high = chunk.index(max(chunk))
+        for i in sorted((low, high)) if low != high else (low,):
+            ts.append(t[start + i])
+            ys.append(chunk[i])
+    return ts, ys
+
+
+def lttb(ts, ys, points):
+    """Largest-Triangle-Three-Buckets reduction of a series to `points` points."""
+    n = len(ys)
+    if points >= n or points < 3:
+        return ts, ys
+    out_t = [ts[0]]
+    out_y = [ys[0]]
+    every = (n - 2) / (points - 2)
+    a = 0
+    for i in range(points - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        # Average of the next bucket, the last point for the last bucket
+        if next_stop > stop:
+            avg_t = sum(ts[stop:next_stop]) / (next_stop - stop)
+            avg_y = sum(ys[stop:next_stop]) / (next_stop - stop)
+        else:
+            avg_t, avg_y = ts[-1], ys[-1]
+        at, ay = ts[a], ys[a]
+        best = start
+        best_area = -1
+        for j in range(start, stop):
+            area = abs((at - avg_t) * (ys[j] - ay) - (at - ts[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out_t.append(ts[best])
+        out_y.append(ys[best])
+        a = best
+    out_t.append(ts[-1])
+    out_y.append(ys[-1])
+    return out_t, out_y
+
+
+def downsample(t, y, points=POINTS):
+    ts, ys = minmax_buckets(t, y, 2 * points)
+    return lttb(ts, ys, points)
+
+
+def _channel_series(args):
+    path, name, points = args
+    with FlightLog(path) as log:
+        if name not in log.channels:
+            return path, name, None
+        t = log.column("t")
+        y = log.column(name)
+        series = downsample(t, y, points)
+        t.release()
+        y.release()
+    return path, name, series
+
+
+def _bucket_means(args):
+    path, channels, edges = args
+    with FlightLog(path) as log:
+        t = log.column("t")
+        bounds = [bisect_left(t, edge) for edge in edges]
+        means = {}
+        for name in channels:
+            if name not in log.channels:
+                continue
+            y = log.column(name)
+            means[name] = [sum(y[i:j]) / (j - i) if j > i else None for i, j in zip(bounds, bounds[1:])]
+            y.release()
+        t.release()
+    return means
+
+
+def _duration(path):
+    with FlightLog(path) as log:
+        if not len(log):
+            return 0
+        t = log.column("t")
+        duration = t[-1]
+        t.release()
+    return duration
+
+
+def percentile(sorted_values, q):
+    """Linear interpolation between the closest ranks."""
+    position = (len(sorted_values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def flight_series(paths, channels, points=POINTS, processes=None):
+    """Downsampled series of every channel of every flight, {path: {channel: (t, y)}}."""
+    series = {path: {} for path in paths}
+    with Pool(processes) as pool:
+        # One task per channel of each file, so that even a single long flight uses every worker
+        for path, name, result in pool.imap_unordered(_channel_series, [(p, c, points) for p in paths for c in channels]):
+            if result is not None:
+                series[path][name] = result
+    return series
+
+
+def ensemble_bands(paths, channels, buckets=ENSEMBLE_BUCKETS, percentiles=PERCENTILES, processes=None):
+    """Bucket times and, for each channel, one list of values per percentile."""
+    with Pool(processes) as pool:
+        end = max(pool.map(_duration, paths))
+        edges = [end * i / buckets for i in range(buckets + 1)]
+        edges[-1] = float("inf")
+        means = pool.map(_bucket_means, [(path, channels, edges) for path in paths])
+    times = [end * (i + 0.5) / buckets for i in range(buckets)]
+    bands = {}
+    for name in channels:
+        columns = [m[name] for m in means if name in m]
+        bands[name] = {q: [] for q in percentiles}
+        for b in range(buckets):
+            values = sorted(column[b] for column in columns if column[b] is not None)
+            for q in percentiles:
+                bands[name][q].append(percentile(values, q) if values else float("nan"))
+    return times, bands
+
+
+## Rendering
+
+def _figure(panels):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    rows = (len(panels) + 1) // 2
+    fig, axes = plt.subplots(rows, 2, figsize=(14, 2.6 * rows), sharex=True, squeeze=False)
+    return plt, fig, [ax for row in axes for ax in row]
+
+
+def render_flights(paths, output, points=POINTS, processes=None):
+    channels = [name for panel in PANELS for name in panel]
+    series = flight_series(paths, channels, points, processes)
+    plt, fig, axes = _figure(PANELS)
+    for ax, panel in zip(axes, PANELS):
+        for path in paths:
+            for name in panel:
+                if name in series[path]:
+                    t, y = series[path][name]
+                    label = name if len(paths) == 1 else f"{name} {path}"
+                    ax.plot(t, y, linewidth=0.8, label=label)
+        ax.set_title(", ".join(panel))
+        if len(panel) > 1:
+            ax.legend(loc="upper right", fontsize="small")
+    for ax in axes[len(PANELS):]:
+        ax.set_visible(False)
+    axes[-2].set_xlabel("time (s)")
+    fig.tight_layout()
+    fig.savefig(output)
+    plt.close(fig)
+
+
+def render_ensemble(paths, output, buckets=ENSEMBLE_BUCKETS, processes=None):
+    channels = [name for panel in PANELS for name in panel]
+    times, bands = ensemble_bands(paths, channels, buckets, PERCENTILES, processes)
+    plt, fig, axes = _figure(PANELS)
+    for ax, panel in zip(axes, PANELS):
+        for name in panel:
+            band = bands[name]
+            line, = ax.plot(times, band[50], linewidth=1, label=f"{name} median")
+            ax.fill_between(times, band[25], band[75], color=line.get_color(), alpha=0.35, linewidth=0)
+            ax.fill_between(times, band[5], band[95], color=line.get_color(), alpha=0.15, linewidth=0)
+        ax.set_title(", ".join(panel) + f" ({len(paths)} flights, 5-25-75-95 %)")
+    for ax in axes[len(PANELS):]:
+        ax.set_visible(False)
+    axes[-2].set_xlabel("time (s)")
+    fig.tight_layout()
+    fig.savefig(output)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render flight logs")
+    parser.add_argument("logs", nargs="+", help="flight log files")
+    parser.add_argument("-o", "--output", default="report.png", help="output image or PDF")
+    parser.add_argument("--ensemble", action="store_true", help="plot percentile bands of the flights")
+    parser.add_argument("--points", type=int, default=POINTS, help="points per channel and flight")
+    parser.add_argument("--buckets", type=int, default=ENSEMBLE_BUCKETS, help="time buckets of an ensemble")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+    if args.ensemble:
+        render_ensemble(args.logs, args.output, args.buckets, args.jobs)
+    else:
+        render_flights(args.logs, args.output, args.points, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+
+Linearization and stability analysis
+
+Trims the plane at a grid of operating points (altitude, airspeed, vertical
+speed) and linearizes the longitudinal dynamics of flightsim.physics there:
+
+    d/dt (vz, vx, altitude) = A (vz, vx, altitude) + B (pitch, throttle, roll)
+
+The Jacobians are central finite differences of the same forces as step().
+Pitch is a control of the model, not a state, so the only possible
+oscillation is the phugoid-like exchange of speed and vertical speed. For
+every point, the eigenvalues of A give the period and damping of the
+oscillatory modes and the time constants of the others.
+
+The largest stable time step is that of step() itself, not of a textbook
+Euler scheme: step() computes lift with the angle of attack of the previous
+step, a lag which halves the acceptable time step of the fast modes. It is
+found on the characteristic polynomial of the linearized step(), without
+running the simulation.
+
+Results are cached per aircraft configuration and grid. Usage:
+
+    python -m flightsim.stability [--aircraft twinjet] --altitude 0:10000:6 --speed 100:250:7 [--vz 0]
+
+"""
+
+
+import argparse
+import cmath
+import math
+
+from .physics import G, PARAMETERS, DEFAULT_PARAMS, compute_rho, compute_cl
+
+
+STATES = ("vz", "vx", "altitude")
+CONTROLS = ("pitch", "throttle", "roll")
+STATE_STEPS = (1e-4, 1e-4, 1e-2) # finite difference steps, m.s^(-1), m.s^(-1), m
+CONTROL_STEPS = (1e-6, 1e-6, 1e-6) # rad, between 0 and 1, rad
+TRIM_TOLERANCE = 1e-9 # m.s^(-2)
+TRIM_ITERATIONS = 30
+MAX_DT = 100 # s, larger time steps are reported as unlimited
+DT_RESOLUTION = 1e-3 # s
+
+_cache = {}
+
+
+def derivatives(vz, vx, altitude, pitch, throttle, roll=0, params=DEFAULT_PARAMS, lift_aoa=None):
+    """Time derivatives of vz, vx and altitude in still air, forces of step().
+
+    The lift coefficient is computed from lift_aoa if given, from the current angle of attack otherwise.
+    """
+    mass = params["MASS"]
+    stall_angle = params["STALL_ANGLE"]
+    rho = compute_rho(altitude)
+    speed = math.sqrt(vz**2 + vx**2)
+    aoa = (pitch - math.asin(vz/speed))*math.cos(roll)
+    cl = compute_cl(aoa if lift_aoa is None else lift_aoa, params["PASSING_POINTS"])
+    if abs(aoa) < stall_angle:
+        cd = params["CD0"] + params["CD_K"]*cl**2
+    else:
+        cd = params["CD_STALL_SLOPE"]*(abs(aoa) - stall_angle) + params["CD_STALL"]
+    thrust = throttle * params["MAX_THRUST_PER_RHO"] * rho
+    dynamic_pressure = params["HALF_WING_SURFACE"] * rho * speed**2
+    lift = dynamic_pressure * cl
+    drag = dynamic_pressure * cd
+    slope = pitch - aoa
+
+    vertical_force = (lift * math.cos(slope) - drag * math.sin(slope))*math.cos(roll) + thrust * math.sin(pitch) - mass * G
+    horizontal_force = lift * -math.sin(slope) - drag * math.cos(slope) + thrust * math.cos(pitch)
+    return vertical_force / mass, horizontal_force / mass, vz
+
+
+def trim(altitude, speed, vz=0, params=DEFAULT_PARAMS):
+    """Pitch and throttle holding a constant airspeed and vertical speed, None if out of the flight envelope.
+
+    The envelope is a throttle between 0 and 1 and an angle of attack below the stall angle.
+    """
+    if abs(vz) >= speed:
+        return None
+    vx = math.sqrt(speed**2 - vz**2)
+    gamma = math.asin(vz/speed)
+    # Initial guess: lift balances the weight on the linear part of the Cl curve, thrust balances the drag
+    dynamic_pressure = params["HALF_WING_SURFACE"] * compute_rho(altitude) * speed**2
+    cl = params["MASS"] * G * math.cos(gamma) / dynamic_pressure
+    pitch = gamma + cl / params["CL_MAX"] * params["STALL_ANGLE"]
+    drag = dynamic_pressure * (params["CD0"] + params["CD_K"]*cl**2) + params["MASS"] * G * math.sin(gamma)
+    throttle = drag / (params["MAX_THRUST_PER_RHO"] * compute_rho(altitude))
+
+    # Newton iterations on (dvz/dt, dvx/dt) = 0
+    h_pitch, h_throttle = CONTROL_STEPS[0], CONTROL_STEPS[1]
+    for _ in range(TRIM_ITERATIONS):
+        az, ax, _ = derivatives(vz, vx, altitude, pitch, throttle, 0, params)
+        if abs(az) < TRIM_TOLERANCE and abs(ax) < TRIM_TOLERANCE:
+            break
+        az_p1, ax_p1, _ = derivatives(vz, vx, altitude, pitch + h_pitch, throttle, 0, params)
+        az_p0, ax_p0, _ = derivatives(vz, vx, altitude, pitch - h_pitch, throttle, 0, params)
+        az_t1, ax_t1, _ = derivatives(vz, vx, altitude, pitch, throttle + h_throttle, 0, params)
+        az_t0, ax_t0, _ = derivatives(vz, vx, altitude, pitch, throttle - h_throttle, 0, params)
+        a = (az_p1 - az_p0) / (2*h_pitch)
+        b = (az_t1 - az_t0) / (2*h_throttle)
+        c = (ax_p1 - ax_p0) / (2*h_pitch)
+        d = (ax_t1 - ax_t0) / (2*h_throttle)
+        det = a*d - b*c
+        if det == 0:
+            return None
+        pitch -= (d*az - b*ax) / det
+        throttle -= (a*ax - c*az) / det
+    else:
+        return None
+
+    aoa = pitch - gamma
+    if not 0 <= throttle <= 1 or abs(aoa) >= params["STALL_ANGLE"]:
+        return None
+    return pitch, throttle
+
+
+def jacobians(vz, vx, altitude, pitch, throttle, roll=0, params=DEFAULT_PARAMS):
+    """A = d(dvz/dt, dvx/dt, daltitude/dt)/d(vz, vx, altitude) and B = .../d(pitch, throttle, roll), as lists of rows."""
+    x = [vz, vx, altitude]
+    u = [pitch, throttle, roll]
+    a_columns = []
+    for i, h in enumerate(STATE_STEPS):
+        x1 = list(x)
+        x0 = list(x)
+        x1[i] += h
+        x0[i] -= h
+        f1 = derivatives(*x1, *u, params)
+        f0 = derivatives(*x0, *u, params)
+        a_columns.append([(y1 - y0) / (2*h) for y1, y0 in zip(f1, f0)])
+    b_columns = []
+    for i, h in enumerate(CONTROL_STEPS):
+        u1 = list(u)
+        u0 = list(u)
+        u1[i] += h
+        u0[i] -= h
+        f1 = derivatives(*x, *u1, params)
+        f0 = derivatives(*x, *u0, params)
+        b_columns.append([(y1 - y0) / (2*h) for y1, y0 in zip(f1, f0)])
+    return [list(row) for row in zip(*a_columns)], [list(row) for row in zip(*b_columns)]
+
+
+def eigenvalues(a):
+    """Eigenvalues of a 3x3 matrix, the real one first, then a real or complex conjugate pair."""
+    # Characteristic polynomial l^3 + c2 l^2 + c1 l + c0
+    c2 = -(a[0][0] + a[1][1] + a[2][2])
+    c1 = (a[0][0]*a[1][1] - a[0][1]*a[1][0]
+          + a[0][0]*a[2][2] - a[0][2]*a[2][0]
+          + a[1][1]*a[2][2] - a[1][2]*a[2][1])
+    c0 = -(a[0][0]*(a[1][1]*a[2][2] - a[1][2]*a[2][1])
+           - a[0][1]*(a[1][0]*a[2][2] - a[1][2]*a[2][0])
+           + a[0][2]*(a[1][0]*a[2][1] - a[1][1]*a[2][0]))
+
+    def p(l):
+        return ((l + c2)*l + c1)*l + c0
+
+    # A real root by bisection within the Cauchy bound, polished by Newton
+    bound = 1 + max(abs(c2), abs(c1), abs(c0))
+    low, high = -bound, bound
+    for _ in range(200):
+        middle = (low + high) / 2
+        if p(middle) < 0:
+            low = middle
+        else:
+            high = middle
+        if high - low <= 1e-15 * bound:
+            break
+    root = (low + high) / 2
+    for _ in range(3):
+        derivative = (3*root + 2*c2)*root + c1
+        if derivative == 0:
+            break
+        root -= p(root) / derivative
+
+    # Deflate to l^2 + b l + c
+    b = c2 + root
+    c = c1 + root*b
+    discriminant = cmath.sqrt(b*b - 4*c)
+    pair = [(-b + discriminant) / 2, (-b - discriminant) / 2]
+    if b*b - 4*c >= 0:
+        pair = [l.real for l in pair]
+    return [root] + pair
+
+
+def modes(values):
+    """Describe eigenvalues: oscillatory modes with period and damping ratio, the others with a time constant."""
+    described = []
+    for l in values:
+        if isinstance(l, complex):
+            if l.imag < 0:
+                continue # the conjugate of the previous one
+            frequency = abs(l)
+            described.append({
+                "kind": "oscillatory",
+                "eigenvalue": l,
+                "period": 2*math.pi / l.imag, # s
+                "damping": -l.real / frequency,
+                "frequency": frequency, # rad.s^(-1)
+            })
+        else:
+            described.append({
+                "kind": "real",
+                "eigenvalue": l,
+                # s, negative for a diverging mode, infinite for a neutral one
+                "time_constant": -1/l if l != 0 else math.inf,
+            })
+    return described
+
+
+def lagged_jacobian(vz, vx, altitude, pitch, throttle, roll=0, params=DEFAULT_PARAMS):
+    """Part of A due to the lift coefficient, which step() takes from the angle of attack of the previous step."""
+    x = [vz, vx, altitude]
+    u = [pitch, throttle, roll]
+    aoa = (pitch - math.asin(vz/math.sqrt(vz**2 + vx**2)))*math.cos(roll)
+    columns = []
+    for i, h in enumerate(STATE_STEPS):
+        x1 = list(x)
+        x0 = list(x)
+        x1[i] += h
+        x0[i] -= h
+        f1 = derivatives(*x1, *u, params)
+        f0 = derivatives(*x0, *u, params)
+        g1 = derivatives(*x1, *u, params, aoa)
+        g0 = derivatives(*x0, *u, params, aoa)
+        columns.append([((y1 - y0) - (z1 - z0)) / (2*h) for y1, y0, z1, z0 in zip(f1, f0, g1, g0)])
+    return [list(row) for row in zip(*columns)]
+
+
+def _poly_mul(p, q):
+    product = [0.0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        for j, b in enumerate(q):
+            product[i + j] += a*b
+    return product
+
+
+def _poly_add(*polys):
+    total = [0.0] * max(len(p) for p in polys)
+    for p in polys:
+        for i, a in enumerate(p):
+            total[i] += a
+    return total
+
+
+def _inside_disk(coefficients, radius):
+    """Schur-Cohn test: are all roots of the polynomial (lowest degree first) of modulus below radius?"""
+    a = [c * radius**k for k, c in enumerate(coefficients)]
+    while len(a) > 1:
+        if abs(a[0]) >= abs(a[-1]):
+            return False
+        n = len(a) - 1
+        a = [a[-1]*a[k] - a[0]*a[n - k] for k in range(1, n + 1)]
+    return True
+
+
+def _step_is_stable(a, a_lagged, dt, growth):
+    # Linearized step(): e(n+1) = M0 e(n) + M1 e(n-1), the lift using the
+    # state of the previous step, and the altitude the updated vz
+    m0 = [[(i == j) + dt*(a[i][j] - a_lagged[i][j]) for j in range(3)] for i in range(2)]
+    m1 = [[dt*a_lagged[i][j] for j in range(3)] for i in range(2)]
+    m0.append([dt*m0[0][j] + (j == 2) for j in range(3)])
+    m1.append([dt*m1[0][j] for j in range(3)])
+    # Characteristic polynomial det(z^2 I - z M0 - M1), coefficients lowest degree first
+    entries = [[[-m1[i][j], -m0[i][j], float(i == j)] for j in range(3)] for i in range(3)]
+    polynomial = _poly_add(
+        _poly_mul(entries[0][0], _poly_add(_poly_mul(entries[1][1], entries[2][2]), [-c for c in _poly_mul(entries[1][2], entries[2][1])])),
+        [-c for c in _poly_mul(entries[0][1], _poly_add(_poly_mul(entries[1][0], entries[2][2]), [-c for c in _poly_mul(entries[1][2], entries[2][0])]))],
+        _poly_mul(entries[0][2], _poly_add(_poly_mul(entries[1][0], entries[2][1]), [-c for c in _poly_mul(entries[1][1], entries[2][0])])),
+    )
+    # Stable when the discrete modes grow no faster than the continuous ones
+    return _inside_disk(polynomial, max(1.0, math.exp(growth*dt)) * (1 + 1e-9))
+
+
+def step_max_dt(a, a_lagged, values):
+    """Largest time step for which step() linearized around the point does not diverge faster than the dynamics."""
+    growth = max(complex(l).real for l in values)
+    low, high = 0.0, 0.01
+    while _step_is_stable(a, a_lagged, high, growth):
+        low, high = high, 2*high
+        if high > MAX_DT:
+            return math.inf
+    while high - low > DT_RESOLUTION:
+        middle = (low + high) / 2
+        if _step_is_stable(a, a_lagged, middle, growth):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def analyze_point(altitude, speed, vz=0, params=DEFAULT_PARAMS):
+    """Trim, Jacobians and modes at one operating point, None out of the flight envelope."""
+    trimmed = trim(altitude, speed, vz, params)
+    if trimmed is None:
+        return None
+    pitch, throttle = trimmed
+    vx = math.sqrt(speed**2 - vz**2)
+    a, b = jacobians(vz, vx, altitude, pitch, throttle, 0, params)
+    a_lagged = lagged_jacobian(vz, vx, altitude, pitch, throttle, 0, params)
+    values = eigenvalues(a)
+    return {
+        "altitude": altitude,
+        "speed": speed,
+        "vz": vz,
+        "pitch": pitch,
+        "throttle": throttle,
+        "A": a,
+        "B": b,
+        "eigenvalues": values,
+        "modes": modes(values),
+        "stable": all(complex(l).real < 0 for l in values),
+        "max_dt": step_max_dt(a, a_lagged, values),
+    }
+
+
+def configuration_key(params):
+    """The plane constants of a parameter dictionary, as a hashable tuple."""
+    return tuple(params[name] for name in PARAMETERS)
+
+
+def analyze(altitudes, speeds, climb_rates=(0,), params=DEFAULT_PARAMS):
+    """analyze_point over the grid altitudes x speeds x climb rates, cached per configuration and grid.
+
+    Returns a list of results in grid order, None for the points out of the flight envelope.
+    """
+    key = (configuration_key(params), tuple(altitudes), tuple(speeds), tuple(climb_rates))
+    if key not in _cache:
+        _cache[key] = [analyze_point(altitude, speed, vz, params)
+                       for altitude in altitudes for speed in speeds for vz in climb_rates]
+    return _cache[key]
+
+
+def max_stable_dt(results):
+    """Largest step() time step acceptable at every operating point of analyze()."""
+    return min((result["max_dt"] for result in results if result is not None), default=math.inf)
+
+
+def main():
+    from .sweep import parse_range
+    from .aircraft import load_profiles
+
+    parser = argparse.ArgumentParser(description="Trim, linearization and stability over operating points")
+    parser.add_argument("--aircraft", help="aircraft type, see flightsim/aircraft, default plane otherwise")
+    parser.add_argument("--altitude", default="0:10000:6", help="altitudes in m, start:stop:count or v1,v2,...")
+    parser.add_argument("--speed", default="100:250:7", help="airspeeds in m/s, start:stop:count or v1,v2,...")
+    parser.add_argument("--vz", default="0", help="vertical speeds in m/s, start:stop:count or v1,v2,...")
+    args = parser.parse_args()
+
+    params = DEFAULT_PARAMS
+    if args.aircraft:
+        profiles = load_profiles()
+        if args.aircraft not in profiles:
+            parser.error(f"unknown aircraft type {args.aircraft}, expected one of {', '.join(profiles)}")
+        params = profiles[args.aircraft]
+
+    results = analyze(parse_range(args.altitude), parse_range(args.speed), parse_range(args.vz), params)
+    print(f"{'altitude':>9}{'speed':>7}{'vz':>6}{'pitch':>7}{'throttle':>9}{'period':>8}{'damping':>9}{'max dt':>8}")
+    for result in results:
+        if result is None:
+            continue
+        oscillatory = [mode for mode in result["modes"] if mode["kind"] == "oscillatory"]
+        period = f"{oscillatory[0]['period']:8.1f}" if oscillatory else f"{'-':>8}"
+        damping = f"{oscillatory[0]['damping']:9.3f}" if oscillatory else f"{'-':>9}"
+        print(f"{result['altitude']:9.0f}{result['speed']:7.0f}{result['vz']:6.1f}"
+              f"{math.degrees(result['pitch']):7.2f}{result['throttle']:9.3f}{period}{damping}{result['max_dt']:8.2f}")
+    trimmed = sum(result is not None for result in results)
+    print(f"{trimmed} of {len(results)} operating points trimmed, step() stable for dt <= {max_stable_dt(results):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
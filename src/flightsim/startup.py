@@ -0,0 +1,117 @@
+"""
+
+Startup benchmark
+
+Measures, in fresh interpreters, what batch workers and the cockpit pay
+before doing any work:
+
+- the import time of the headless modules, and which heavy modules
+  (tkinter, pygame, http.server...) they pull in, which should be none;
+- the time from spawning the cockpit to its first frame on screen.
+
+Every run of the benchmark can be appended to a JSON lines history file to
+follow these times across versions. Usage:
+
+    python -m flightsim.startup [--runs 10] [--history startup.jsonl]
+
+"""
+
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+MODULES = ("flightsim.physics", "flightsim.analytics", "flightsim.fleet", "flightsim.sweep", "flightsim.cockpit")
+HEAVY_MODULES = ("tkinter", "pygame", "http.server", "multiprocessing", "numpy", "matplotlib")
+FIRST_FRAME_TIMEOUT = 30 # s
+
+_IMPORT_CODE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+t = time.perf_counter() - t
+print(t)
+print(" ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _environment():
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_time(module, runs):
+    """Median import time of a module in a fresh interpreter, and the heavy modules it loaded."""
+    times = []
+    heavy = ""
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_CODE.format(module=module, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, env=_environment(), check=True).stdout.split("\n")
+        times.append(float(out[0]))
+        heavy = out[1]
+    return statistics.median(times), heavy.split()
+
+
+def interpreter_time(runs):
+    """Median wall time of starting and stopping an interpreter doing nothing."""
+    times = []
+    for _ in range(runs):
+        t = time.time()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        times.append(time.time() - t)
+    return statistics.median(times)
+
+
+def time_to_first_frame(runs):
+    """Median time from spawning the cockpit to its first frame, None without a display."""
+    times = []
+    for _ in range(runs):
+        t = time.time()
+        try:
+            result = subprocess.run([sys.executable, "-m", "flightsim", "--exit-after-first-frame"], capture_output=True,
+                                    text=True, env=_environment(), timeout=FIRST_FRAME_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return None
+        lines = [line for line in result.stdout.split("\n") if line.startswith("first frame ")]
+        if not lines:
+            return None
+        times.append(float(lines[0].split()[-1]) - t)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first frame of the simulator")
+    parser.add_argument("--runs", type=int, default=10, help="runs per measure, the median is kept")
+    parser.add_argument("--history", help="append the results to this JSON lines file")
+    parser.add_argument("--no-ui", action="store_true", help="skip the time to first frame")
+    args = parser.parse_args()
+
+    results = {"time": time.time(), "python": sys.version.split()[0]}
+    results["interpreter"] = interpreter_time(args.runs)
+    print(f"{'interpreter start':<32}{1000 * results['interpreter']:8.1f} ms")
+    for module in MODULES:
+        duration, heavy = import_time(module, args.runs)
+        results[module] = {"import": duration, "heavy_modules": heavy}
+        print(f"{'import ' + module:<32}{1000 * duration:8.1f} ms" + (f"  loads {', '.join(heavy)}" if heavy else ""))
+    if not args.no_ui:
+        first_frame = time_to_first_frame(max(1, args.runs // 3))
+        results["first_frame"] = first_frame
+        if first_frame is None:
+            print("time to first frame: no display")
+        else:
+            print(f"{'time to first frame':<32}{1000 * first_frame:8.1f} ms")
+
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+
+Parameter sweep and sensitivity analysis
+
+Runs headless flights over a grid of plane parameters, in parallel, and
+measures how much each parameter moves the trajectory. Every flight result
+is stored in a cache directory under a hash of its parameters, initial
+state, duration, time step and of the source code of the model and of the
+sweep, so that running an overlapping sweep only computes the new points.
+
+Usage:
+
+    python -m flightsim.sweep MASS=80000:120000:5 ENGINE_THRUST=150000,180000,210000 --duration 600
+
+A range is either start:stop:count (count evenly spaced values, both ends
+included) or a comma separated list of values.
+
+"""
+
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+from . import aircraft
+from . import metrics
+from . import physics
+from .physics import make_params, make_state, step
+
+
+CACHE_DIR = ".sweep_cache"
+OUTPUTS = ("final_altitude", "min_altitude", "max_altitude", "final_speed", "min_speed", "max_speed", "distance", "stall_time")
+
+
+# Source files whose changes invalidate the cache: the model, the outputs
+# computed by run_flight, and the profiles building the parameters
+CODE_FILES = (physics.__file__, __file__, aircraft.__file__)
+
+def _code_version():
+    digest = hashlib.sha256()
+    for path in CODE_FILES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+CODE_VERSION = _code_version()
+
+
+def default_state():
+    """Initial state of the headless plane of flightsim.physics."""
+    return make_state(physics.pitch, physics.roll, physics.throttle,
+                      physics.altitude, physics.vz, physics.vx)
+
+
+def run_flight(overrides, state, duration, dt):
+    """Fly `duration` seconds with the given parameter overrides and summarize the trajectory."""
+    started = time.perf_counter()
+    params = make_params(**overrides)
+    state = dict(state)
+    stall_angle = params["STALL_ANGLE"]
+    min_altitude = max_altitude = state["altitude"]
+    min_speed = max_speed = state["speed"]
+    stall_time = 0
+    for _ in range(int(duration / dt)):
+        step(state, dt, None, params)
+        min_altitude = min(min_altitude, state["altitude"])
+        max_altitude = max(max_altitude, state["altitude"])
+        min_speed = min(min_speed, state["speed"])
+        max_speed = max(max_speed, state["speed"])
+        if abs(state["aoa"]) > stall_angle:
+            stall_time += dt
+    metrics.PHYSICS_STEPS.inc(int(duration / dt))
+    metrics.SIMULATED_SECONDS.inc(duration)
+    metrics.REAL_TIME_FACTOR.set(duration / (time.perf_counter() - started))
+    return {
+        "final_altitude": state["altitude"],
+        "min_altitude": min_altitude,
+        "max_altitude": max_altitude,
+        "final_speed": state["speed"],
+        "min_speed": min_speed,
+        "max_speed": max_speed,
+        "distance": math.hypot(state["north"], state["east"]),
+        "stall_time": stall_time,
+    }
+
+
+def cache_key(overrides, state, duration, dt):
+    description = {
+        "params": overrides,
+        "state": state,
+        "duration": duration,
+        "dt": dt,
+        "code": CODE_VERSION,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + ".json")
+
+
+def _load(cache_dir, key):
+    try:
+        with open(_cache_path(cache_dir, key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(cache_dir, key, result):
+    path = _cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so that concurrent sweeps never read half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, path)
+
+
+def _run_point(args):
+    key, overrides, state, duration, dt = args
+    return key, run_flight(overrides, state, duration, dt)
+
+
+def grid(ranges):
+    """Every combination of the parameter values, as a list of override dictionaries."""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[n] for n in names))]
+
+
+def sweep(ranges, state=None, duration=600, dt=0.1, cache_dir=CACHE_DIR, processes=None):
+    """Run every point of the grid not already in the cache, return [(overrides, result)] and the number of new runs."""
+    state = state if state is not None else default_state()
+    points = grid(ranges)
+    results = {}
+    todo = []
+    for overrides in points:
+        key = cache_key(overrides, state, duration, dt)
+        cached = _load(cache_dir, key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            todo.append((key, overrides, state, duration, dt))
+    if todo:
+        with Pool(processes, initializer=metrics.serve_from_env, initargs=(True,)) as pool:
+            for key, result in pool.imap_unordered(_run_point, todo):
+                _store(cache_dir, key, result)
+                results[key] = result
+    return [(overrides, results[cache_key(overrides, state, duration, dt)]) for overrides in points], len(todo)
+
+
+def sensitivities(runs, names, outputs=OUTPUTS):
+    """Elasticity of every output to every parameter: least squares slope times mean(parameter)/mean(output)."""
+    table = {}
+    for name in names:
+        xs = [overrides[name] for overrides, _ in runs]
+        x_mean = sum(xs) / len(xs)
+        sxx = sum((x - x_mean)**2 for x in xs)
+        for output in outputs:
+            ys = [result[output] for _, result in runs]
+            y_mean = sum(ys) / len(ys)
+            if sxx == 0 or y_mean == 0:
+                table[name, output] = 0.0
+                continue
+            slope = sum((x - x_mean)*(y - y_mean) for x, y in zip(xs, ys)) / sxx
+            table[name, output] = slope * x_mean / y_mean
+    return table
+
+
+def parse_range(text):
+    if ":" in text:
+        start, stop, count = text.split(":")
+        start, stop, count = float(start), float(stop), int(count)
+        if count == 1:
+            return [start]
+        return [start + (stop - start) * i / (count - 1) for i in range(count)]
+    return [float(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plane parameter sweep and sensitivity analysis")
+    parser.add_argument("ranges", nargs="+", metavar="NAME=RANGE", help="parameter range, start:stop:count or v1,v2,...")
+    parser.add_argument("--duration", type=float, default=600, help="flight duration in s")
+    parser.add_argument("--dt", type=float, default=0.1, help="time step in s")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--cache", default=CACHE_DIR, help="cache directory")
+    parser.add_argument("--csv", help="write every run to this CSV file")
+    args = parser.parse_args()
+
+    ranges = {}
+    for item in args.ranges:
+        name, _, text = item.partition("=")
+        if name not in physics.PARAMETERS:
+            parser.error(f"unknown parameter {name}, expected one of {', '.join(physics.PARAMETERS)}")
+        ranges[name] = parse_range(text)
+
+    metrics.serve_from_env()
+    runs, computed = sweep(ranges, None, args.duration, args.dt, args.cache, args.jobs)
+    print(f"{len(runs)} runs, {computed} computed, {len(runs) - computed} from cache")
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write(",".join(list(ranges) + list(OUTPUTS)) + "\n")
+            for overrides, result in runs:
+                f.write(",".join(str(v) for v in list(overrides.values()) + [result[o] for o in OUTPUTS]) + "\n")
+
+    table = sensitivities(runs, list(ranges))
+    print("Elasticities (relative change of the output for a relative change of the parameter)")
+    print(f"{'':>16}" + "".join(f"{name:>16}" for name in ranges))
+    for output in OUTPUTS:
+        print(f"{output:>16}" + "".join(f"{table[name, output]:>16.3f}" for name in ranges))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+
+Terrain elevation database
+
+A terrain database is a directory holding a terrain.json description and
+square elevation tiles named tile_<row>_<col>.f32. Each tile is a raw
+little-endian float32 grid of (tile_size + 1) x (tile_size + 1) heights in
+metres, rows going north and columns going east. Neighbouring tiles share
+their border samples so that bilinear interpolation never has to look into
+two tiles at once.
+
+Tiles are memory-mapped when first touched and kept in a small LRU cache,
+so only the pages under the flight path are ever read from disk, whatever
+the size of the whole dataset.
+
+"""
+
+
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+from collections import OrderedDict
+
+
+METADATA_FILE = "terrain.json"
+TILE_NAME = "tile_{}_{}.f32"
+
+MAX_OPEN_TILES = 64
+LOOK_AHEAD_STEP = 1 # s
+
+
+class _Tile:
+
+    __slots__ = ("file", "map", "heights")
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.heights = memoryview(self.map).cast("f")
+
+    def close(self):
+        self.heights.release()
+        self.map.close()
+        self.file.close()
+
+
+class TerrainDatabase:
+    """Memory-mapped tiled elevation model with bilinear height queries."""
+
+    def __init__(self, directory, max_open_tiles=MAX_OPEN_TILES):
+        if sys.byteorder != "little":
+            raise RuntimeError("terrain tiles are little-endian float32, big-endian hosts are not supported")
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        self.directory = directory
+        self.spacing = float(metadata["spacing"]) # m between two samples
+        self.tile_size = int(metadata["tile_size"]) # cells per tile side
+        self.origin_north = float(metadata.get("origin_north", 0)) # m
+        self.origin_east = float(metadata.get("origin_east", 0)) # m
+        self.default_height = float(metadata.get("default_height", 0)) # m, used where no tile exists
+        self.max_open_tiles = max_open_tiles
+        self._tiles = OrderedDict()
+        self._missing = set()
+        self._last_key = None
+        self._last_tile = None
+
+    def close(self):
+        for tile in self._tiles.values():
+            tile.close()
+        self._tiles.clear()
+        self._last_key = None
+        self._last_tile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _tile(self, row, col):
+        key = (row, col)
+        if key == self._last_key:
+            return self._last_tile
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        elif key not in self._missing:
+            path = os.path.join(self.directory, TILE_NAME.format(row, col))
+            if os.path.exists(path):
+                tile = _Tile(path)
+                self._tiles[key] = tile
+                if len(self._tiles) > self.max_open_tiles:
+                    _, evicted = self._tiles.popitem(last=False)
+                    evicted.close()
+            else:
+                self._missing.add(key)
+        self._last_key = key
+        self._last_tile = tile
+        return tile
+
+    def height_at(self, north, east):
+        """Terrain height in metres at a point, bilinearly interpolated."""
+        gn = (north - self.origin_north) / self.spacing
+        ge = (east - self.origin_east) / self.spacing
+        i = math.floor(gn)
+        j = math.floor(ge)
+        row, i_in = divmod(i, self.tile_size)
+        col, j_in = divmod(j, self.tile_size)
+        tile = self._tile(row, col)
+        if tile is None:
+            return self.default_height
+        h = tile.heights
+        n = self.tile_size + 1
+        k = i_in * n + j_in
+        fn = gn - i
+        fe = ge - j
+        south = h[k] + (h[k + 1] - h[k]) * fe
+        north_edge = h[k + n] + (h[k + n + 1] - h[k + n]) * fe
+        return south + (north_edge - south) * fn
+
+    def heights_at(self, norths, easts):
+        """Terrain heights for a batch of points (e.g. every plane of a fleet)."""
+        height_at = self.height_at
+        return [height_at(n, e) for n, e in zip(norths, easts)]
+
+    def min_clearance_ahead(self, north, east, v_north, v_east, vz, altitude, horizon, step=LOOK_AHEAD_STEP):
+        """Smallest height above terrain along the straight path flown for `horizon` seconds.
+
+        v_north and v_east are the ground velocity, wind drift included, see flightsim.physics.ground_velocity.
+        """
+        dn = v_north * step
+        de = v_east * step
+        dz = vz * step
+        clearance = altitude - self.height_at(north, east)
+        for _ in range(int(horizon / step)):
+            north += dn
+            east += de
+            altitude += dz
+            clearance = min(clearance, altitude - self.height_at(north, east))
+        return clearance
+
+
+def write_tiles(directory, heights, spacing, tile_size=256, origin_north=0, origin_east=0, default_height=0):
+    """Cut a DEM given as a list of rows (south to north) into a terrain database."""
+    os.makedirs(directory, exist_ok=True)
+    nb_rows = len(heights)
+    nb_cols = len(heights[0])
+    n = tile_size + 1
+    for row in range(math.ceil((nb_rows - 1) / tile_size)):
+        for col in range(math.ceil((nb_cols - 1) / tile_size)):
+            tile = array("f")
+            for i in range(row * tile_size, row * tile_size + n):
+                source = heights[min(i, nb_rows - 1)]
+                for j in range(col * tile_size, col * tile_size + n):
+                    tile.append(source[min(j, nb_cols - 1)])
+            if sys.byteorder != "little":
+                tile.byteswap()
+            with open(os.path.join(directory, TILE_NAME.format(row, col)), "wb") as f:
+                tile.tofile(f)
+    metadata = {
+        "spacing": spacing,
+        "tile_size": tile_size,
+        "origin_north": origin_north,
+        "origin_east": origin_east,
+        "default_height": default_height,
+    }
+    with open(os.path.join(directory, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=4)
@@ -0,0 +1,149 @@
+"""
+
+Gridded weather field
+
+A weather file is a JSON document giving the grid axes and one snapshot of
+the wind and temperature fields per time step:
+
+    {
+        "times": [0, 600, ...],              # s, simulation time
+        "north": [...], "east": [...],       # m, grid axes
+        "altitude": [...],                   # m
+        "snapshots": [
+            {"wind_north": [...], "wind_east": [...], "wind_up": [...], "temperature": [...]},
+            ...
+        ]
+    }
+
+Every field of a snapshot is flattened in (north, east, altitude) order, the
+altitude index varying fastest. Winds are in m/s, temperatures in K.
+Gusts and turbulence are resolved by the gridded wind itself, with as many
+snapshots as needed.
+
+Values are interpolated trilinearly in space and linearly in time, and
+clamped to the border of the grid. Each plane holds a WeatherProbe which
+remembers the cell it is in, so that a plane staying in the same cell only
+pays for the interpolation weights, not for the cell lookup.
+
+"""
+
+
+import json
+import math
+from array import array
+from bisect import bisect_right
+
+
+FIELDS = ("wind_north", "wind_east", "wind_up", "temperature")
+
+
+def _locate(axis, x):
+    """Cell of `axis` containing x as (index, lower bound, upper bound) of the containing interval."""
+    last = len(axis) - 1
+    if last == 0:
+        return 0, -math.inf, math.inf
+    i = min(max(bisect_right(axis, x) - 1, 0), last - 1)
+    low = axis[i] if i > 0 else -math.inf
+    high = axis[i + 1] if i + 1 < last else math.inf
+    return i, low, high
+
+
+def _fraction(axis, i, x):
+    if len(axis) == 1:
+        return 0.0
+    f = (x - axis[i]) / (axis[i + 1] - axis[i])
+    return 0.0 if f < 0 else 1.0 if f > 1 else f
+
+
+class WeatherField:
+    """Time-varying 3D wind and temperature field loaded from a gridded file."""
+
+    def __init__(self, path):
+        with open(path) as f:
+            data = json.load(f)
+        self.times = [float(t) for t in data["times"]]
+        self.north = [float(x) for x in data["north"]]
+        self.east = [float(x) for x in data["east"]]
+        self.altitude = [float(x) for x in data["altitude"]]
+        size = len(self.north) * len(self.east) * len(self.altitude)
+        self.snapshots = []
+        for snapshot in data["snapshots"]:
+            fields = tuple(array("d", snapshot[name]) for name in FIELDS)
+            if any(len(values) != size for values in fields):
+                raise ValueError(f"{path}: every field must hold {size} values")
+            self.snapshots.append(fields)
+        if len(self.snapshots) != len(self.times):
+            raise ValueError(f"{path}: expected one snapshot per time step")
+
+    def _corners(self, it, i, j, k):
+        """Values of every field at the 8 corners of a cell, for 2 consecutive snapshots."""
+        ne = len(self.east)
+        na = len(self.altitude)
+        di = ne * na if len(self.north) > 1 else 0
+        dj = na if len(self.east) > 1 else 0
+        dk = 1 if na > 1 else 0
+        base = (i * ne + j) * na + k
+        offsets = (base, base + dk, base + dj, base + dj + dk,
+                   base + di, base + di + dk, base + di + dj, base + di + dj + dk)
+        it1 = it + 1 if len(self.times) > 1 else it
+        corners = []
+        for f in range(len(FIELDS)):
+            v0 = self.snapshots[it][f]
+            v1 = self.snapshots[it1][f]
+            corners.append([v0[o] for o in offsets] + [v1[o] for o in offsets])
+        return corners
+
+    def probe(self):
+        return WeatherProbe(self)
+
+    def sample_many(self, t, norths, easts, altitudes, probes):
+        """Sample the field for a batch of planes, each one keeping its own probe."""
+        return [p.sample(t, n, e, a) for p, n, e, a in zip(probes, norths, easts, altitudes)]
+
+
+class WeatherProbe:
+    """Per-plane view of a WeatherField caching the current cell."""
+
+    __slots__ = ("field", "cell", "bounds", "corners")
+
+    def __init__(self, field):
+        self.field = field
+        self.cell = None
+        self.bounds = None
+        self.corners = None
+
+    def _relocate(self, t, north, east, altitude):
+        field = self.field
+        it, t0, t1 = _locate(field.times, t)
+        i, n0, n1 = _locate(field.north, north)
+        j, e0, e1 = _locate(field.east, east)
+        k, a0, a1 = _locate(field.altitude, altitude)
+        self.cell = (it, i, j, k)
+        self.bounds = (t0, t1, n0, n1, e0, e1, a0, a1)
+        self.corners = field._corners(it, i, j, k)
+
+    def sample(self, t, north, east, altitude):
+        """(wind_north, wind_east, wind_up, temperature) at a point of space and time."""
+        b = self.bounds
+        if (b is None or not (b[0] <= t < b[1] and b[2] <= north < b[3]
+                              and b[4] <= east < b[5] and b[6] <= altitude < b[7])):
+            self._relocate(t, north, east, altitude)
+        field = self.field
+        it, i, j, k = self.cell
+        ft = _fraction(field.times, it, t)
+        fn = _fraction(field.north, i, north)
+        fe = _fraction(field.east, j, east)
+        fa = _fraction(field.altitude, k, altitude)
+        values = []
+        for c in self.corners:
+            v = []
+            for s in (0, 8):
+                c00 = c[s] + (c[s + 1] - c[s]) * fa
+                c01 = c[s + 2] + (c[s + 3] - c[s + 2]) * fa
+                c10 = c[s + 4] + (c[s + 5] - c[s + 4]) * fa
+                c11 = c[s + 6] + (c[s + 7] - c[s + 6]) * fa
+                c0 = c00 + (c01 - c00) * fe
+                c1 = c10 + (c11 - c10) * fe
+                v.append(c0 + (c1 - c0) * fn)
+            values.append(v[0] + (v[1] - v[0]) * ft)
+        return tuple(values)
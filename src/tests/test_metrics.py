@@ -0,0 +1,93 @@
+"""
+
+Scrape the metrics endpoint while two threads record into the same metrics.
+
+"""
+
+
+import threading
+import urllib.request
+
+from flightsim import metrics
+
+
+EVENTS = metrics.counter("flightsim_test_events_total", "Events counted by the test.")
+DURATIONS = metrics.histogram("flightsim_test_seconds", "Durations observed by the test.", buckets=(0.01, 0.1, 1))
+RECORDS = 1000 # per thread
+
+
+def _record(offset):
+    for i in range(RECORDS):
+        EVENTS.inc()
+        DURATIONS.observe(offset + i / RECORDS)
+    metrics.STALL_ALARMS.inc()
+    metrics.TOO_LOW_ALARMS.inc()
+
+
+def _scrape(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+        assert response.status == 200
+        return response.read().decode()
+
+
+def _samples(text, name):
+    """Values of the samples of a metric, by sample name with labels."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith(name) and not line.startswith("#"):
+            sample, value = line.rsplit(" ", 1)
+            samples[sample] = float(value)
+    return samples
+
+
+def test_scrape_from_two_threads():
+    port = metrics.serve(0)
+    threads = [threading.Thread(target=_record, args=(offset,)) for offset in (0, 0.5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    text = _scrape(port)
+
+    # Counter: the per-thread accumulators are summed
+    assert _samples(text, "flightsim_test_events_total") == {"flightsim_test_events_total": 2 * RECORDS}
+
+    # Histogram: cumulative buckets, the last one equal to the count
+    samples = _samples(text, "flightsim_test_seconds")
+    buckets = [samples[f'flightsim_test_seconds_bucket{{le="{bound}"}}'] for bound in ("0.01", "0.1", "1", "+Inf")]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == samples["flightsim_test_seconds_count"] == 2 * RECORDS
+    expected_sum = sum(offset + i / RECORDS for offset in (0, 0.5) for i in range(RECORDS))
+    assert abs(samples["flightsim_test_seconds_sum"] - expected_sum) < 1e-6
+    # 0, 0.001 ... 0.01 from the first thread
+    assert buckets[0] == 11
+
+    # Both alarms are series of one metric, described once
+    assert text.count("# HELP flightsim_alarm_activations_total ") == 1
+    assert text.count("# TYPE flightsim_alarm_activations_total counter") == 1
+    alarms = _samples(text, "flightsim_alarm_activations_total")
+    assert alarms['flightsim_alarm_activations_total{alarm="stall_alarm"}'] >= 2
+    assert alarms['flightsim_alarm_activations_total{alarm="too_low_alarm"}'] >= 2
+    lines = text.splitlines()
+    help_line = lines.index("# TYPE flightsim_alarm_activations_total counter")
+    assert {line.split("{")[0] for line in lines[help_line + 1:help_line + 3]} == {"flightsim_alarm_activations_total"}
+
+
+def test_unknown_path():
+    port = metrics.serve(0)
+    try:
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+    except urllib.error.HTTPError as error:
+        assert error.code == 404
+    else:
+        raise AssertionError("expected a 404")
+
+
+def test_series_registered_later_stay_grouped():
+    metrics.counter("flightsim_test_grouped_total", "Grouped series.", {"kind": "first"})
+    metrics.counter("flightsim_test_other_total", "Another metric.")
+    metrics.counter("flightsim_test_grouped_total", "Grouped series.", {"kind": "second"}).inc()
+    lines = metrics.render().splitlines()
+    start = lines.index("# TYPE flightsim_test_grouped_total counter")
+    assert lines[start + 1:start + 3] == ['flightsim_test_grouped_total{kind="first"} 0',
+                                          'flightsim_test_grouped_total{kind="second"} 1']